@@ -18,7 +18,7 @@ if str(project_root) not in sys.path:
 
 from backend.config import config as backend_config
 from backend.db.base import Base
-from backend.models import Guild, Knowledge, Ticket, UsageLog, Message  # noqa: F401
+from backend.models import Guild, Knowledge, KnowledgeChunk, Ticket, UsageLog, Message  # noqa: F401
 
 config = context.config
 if config.config_file_name is not None:
@@ -0,0 +1,58 @@
+"""pgvector embedding column with HNSW index on knowledge
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-18
+
+The vector extension is optional: if it is not available (or cannot be
+created with the current role) only the guild_id index is added and search
+stays on the in-process path.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "002"
+down_revision: Union[str, None] = "001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _create_vector_extension(bind: sa.engine.Connection) -> bool:
+    """Try to enable pgvector inside a savepoint; False if not possible."""
+    available = bind.execute(
+        sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'vector'")
+    ).scalar()
+    if not available:
+        return False
+    try:
+        with bind.begin_nested():
+            bind.execute(sa.text("CREATE EXTENSION IF NOT EXISTS vector"))
+    except sa.exc.DBAPIError:
+        return False
+    return True
+
+
+def upgrade() -> None:
+    op.create_index("ix_knowledge_guild_id", "knowledge", ["guild_id"])
+
+    if not _create_vector_extension(op.get_bind()):
+        return
+
+    op.execute("ALTER TABLE knowledge ADD COLUMN embedding_vec vector(384)")
+    op.execute(
+        "UPDATE knowledge SET embedding_vec = embedding::vector "
+        "WHERE embedding IS NOT NULL"
+    )
+    op.execute(
+        "CREATE INDEX ix_knowledge_embedding_vec_hnsw ON knowledge "
+        "USING hnsw (embedding_vec vector_cosine_ops)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_knowledge_embedding_vec_hnsw")
+    op.execute("ALTER TABLE knowledge DROP COLUMN IF EXISTS embedding_vec")
+    op.drop_index("ix_knowledge_guild_id", table_name="knowledge")
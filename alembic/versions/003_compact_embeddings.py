@@ -0,0 +1,74 @@
+"""Compact knowledge embeddings: float array -> float32/int8 bytea
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-18
+
+Rows are converted in keyset-paginated batches. The format follows
+EMBEDDING_STORAGE (float32 or int8).
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from backend.config import config
+from backend.db.types import decode_embedding, encode_embedding
+
+revision: str = "003"
+down_revision: Union[str, None] = "002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 500
+
+
+def _convert(source: str, target: str, transform) -> None:
+    """Copy knowledge.<source> into knowledge.<target> in batches by id."""
+    bind = op.get_bind()
+    select_first = sa.text(
+        f"SELECT id, {source} AS value FROM knowledge "
+        f"WHERE {source} IS NOT NULL ORDER BY id LIMIT :limit"
+    )
+    select_next = sa.text(
+        f"SELECT id, {source} AS value FROM knowledge "
+        f"WHERE {source} IS NOT NULL AND id > :last_id ORDER BY id LIMIT :limit"
+    )
+    update = sa.text(f"UPDATE knowledge SET {target} = :value WHERE id = :id")
+    last_id = None
+    while True:
+        if last_id is None:
+            rows = bind.execute(select_first, {"limit": BATCH_SIZE}).all()
+        else:
+            rows = bind.execute(select_next, {"last_id": last_id, "limit": BATCH_SIZE}).all()
+        if not rows:
+            break
+        bind.execute(update, [{"id": row.id, "value": transform(row.value)} for row in rows])
+        last_id = rows[-1].id
+
+
+def upgrade() -> None:
+    op.add_column("knowledge", sa.Column("embedding_blob", sa.LargeBinary(), nullable=True))
+    _convert(
+        "embedding",
+        "embedding_blob",
+        lambda value: encode_embedding(value, config.embedding_storage),
+    )
+    op.drop_column("knowledge", "embedding")
+    op.alter_column("knowledge", "embedding_blob", new_column_name="embedding")
+
+
+def downgrade() -> None:
+    op.add_column(
+        "knowledge",
+        sa.Column("embedding_array", postgresql.ARRAY(sa.Float()), nullable=True),
+    )
+    _convert(
+        "embedding",
+        "embedding_array",
+        lambda value: decode_embedding(value).tolist(),
+    )
+    op.drop_column("knowledge", "embedding")
+    op.alter_column("knowledge", "embedding_array", new_column_name="embedding")
@@ -0,0 +1,95 @@
+"""Knowledge passages: knowledge_chunks table with per-passage embeddings
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-18
+
+Existing entries are carried over as a single passage holding the full
+content and the existing whole-entry embedding; they are split into proper
+passages the next time their content is saved. The pgvector column and
+HNSW index (if migration 002 created them) move to knowledge_chunks.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = "004"
+down_revision: Union[str, None] = "003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_column(table: str, column: str) -> bool:
+    return (
+        op.get_bind()
+        .execute(
+            sa.text(
+                "SELECT 1 FROM information_schema.columns "
+                "WHERE table_name = :table AND column_name = :column"
+            ),
+            {"table": table, "column": column},
+        )
+        .scalar()
+        is not None
+    )
+
+
+def upgrade() -> None:
+    op.create_table(
+        "knowledge_chunks",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("knowledge_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("guild_id", sa.BigInteger(), nullable=False),
+        sa.Column("position", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("embedding", sa.LargeBinary(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint("id"),
+        sa.ForeignKeyConstraint(["knowledge_id"], ["knowledge.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["guild_id"], ["guilds.id"], ondelete="CASCADE"),
+    )
+    op.create_index("ix_knowledge_chunks_guild_id", "knowledge_chunks", ["guild_id"])
+    op.create_index("ix_knowledge_chunks_knowledge_id", "knowledge_chunks", ["knowledge_id"])
+
+    op.execute(
+        "INSERT INTO knowledge_chunks (id, knowledge_id, guild_id, position, content, embedding) "
+        "SELECT gen_random_uuid(), id, guild_id, 0, content, embedding FROM knowledge"
+    )
+
+    if _has_column("knowledge", "embedding_vec"):
+        op.execute("ALTER TABLE knowledge_chunks ADD COLUMN embedding_vec vector(384)")
+        op.execute(
+            "UPDATE knowledge_chunks c SET embedding_vec = k.embedding_vec "
+            "FROM knowledge k WHERE k.id = c.knowledge_id"
+        )
+        op.execute(
+            "CREATE INDEX ix_knowledge_chunks_embedding_vec_hnsw ON knowledge_chunks "
+            "USING hnsw (embedding_vec vector_cosine_ops)"
+        )
+        op.execute("DROP INDEX IF EXISTS ix_knowledge_embedding_vec_hnsw")
+        op.drop_column("knowledge", "embedding_vec")
+
+    op.drop_column("knowledge", "embedding")
+
+
+def downgrade() -> None:
+    # Whole-entry vectors are gone; the first passage's vector stands in
+    op.add_column("knowledge", sa.Column("embedding", sa.LargeBinary(), nullable=True))
+    op.execute(
+        "UPDATE knowledge k SET embedding = c.embedding "
+        "FROM knowledge_chunks c WHERE c.knowledge_id = k.id AND c.position = 0"
+    )
+    if _has_column("knowledge_chunks", "embedding_vec"):
+        op.execute("ALTER TABLE knowledge ADD COLUMN embedding_vec vector(384)")
+        op.execute(
+            "UPDATE knowledge k SET embedding_vec = c.embedding_vec "
+            "FROM knowledge_chunks c WHERE c.knowledge_id = k.id AND c.position = 0"
+        )
+        op.execute(
+            "CREATE INDEX ix_knowledge_embedding_vec_hnsw ON knowledge "
+            "USING hnsw (embedding_vec vector_cosine_ops)"
+        )
+    op.drop_table("knowledge_chunks")
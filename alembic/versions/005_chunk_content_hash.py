@@ -0,0 +1,29 @@
+"""Knowledge chunks: content_hash for embedding reuse
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-18
+
+Existing chunks are left without a hash: their vectors may predate a title
+edit, so they are not offered for reuse until the entry is saved again.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "005"
+down_revision: Union[str, None] = "004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("knowledge_chunks", sa.Column("content_hash", sa.String(64), nullable=True))
+    op.create_index("ix_knowledge_chunks_content_hash", "knowledge_chunks", ["content_hash"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_knowledge_chunks_content_hash", table_name="knowledge_chunks")
+    op.drop_column("knowledge_chunks", "content_hash")
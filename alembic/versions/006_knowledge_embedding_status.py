@@ -0,0 +1,35 @@
+"""Knowledge: embedding_status for asynchronous embedding
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "006"
+down_revision: Union[str, None] = "005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "knowledge",
+        sa.Column("embedding_status", sa.String(16), nullable=False, server_default="ready"),
+    )
+    # Workers re-queue pending entries on startup
+    op.create_index(
+        "ix_knowledge_embedding_status_pending",
+        "knowledge",
+        ["embedding_status"],
+        postgresql_where=sa.text("embedding_status <> 'ready'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_knowledge_embedding_status_pending", table_name="knowledge")
+    op.drop_column("knowledge", "embedding_status")
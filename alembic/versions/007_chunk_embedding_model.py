@@ -0,0 +1,35 @@
+"""Knowledge chunks: embedding_model recorded per vector
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-18
+
+Existing vectors were all produced by all-MiniLM-L6-v2, the only model
+used before this column existed.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "007"
+down_revision: Union[str, None] = "006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("knowledge_chunks", sa.Column("embedding_model", sa.String(100), nullable=True))
+    # Fixed on purpose, not config.embedding_model: this labels the model that
+    # produced the existing vectors. If EMBEDDING_MODEL was already switched,
+    # reading it here would mark old vectors as current and run_reembed.py
+    # would skip them.
+    op.execute(
+        "UPDATE knowledge_chunks SET embedding_model = 'all-MiniLM-L6-v2' "
+        "WHERE embedding IS NOT NULL"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("knowledge_chunks", "embedding_model")
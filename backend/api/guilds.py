@@ -2,11 +2,14 @@
 
 import structlog
 from fastapi import APIRouter, Depends, HTTPException
+from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from backend.db.session import get_session
+from backend.dependencies import get_redis
 from backend.schemas.guild import GuildResponse, GuildUpdate
 from backend.schemas.plans import PLAN_LIMITS
+from backend.services.guild_cache import publish_guild_settings_changed
 from backend.services.guild_service import upsert_guild, get_guild
 
 logger = structlog.get_logger(__name__)
@@ -39,6 +42,7 @@ async def update_guild(
     guild_id: str,
     body: GuildUpdate,
     session: AsyncSession = Depends(get_session),
+    redis: Redis = Depends(get_redis),
 ) -> GuildResponse:
     """Update mutable guild fields: name, plan, system_prompt."""
     try:
@@ -66,6 +70,9 @@ async def update_guild(
     if body.system_prompt is not None:
         guild.system_prompt = body.system_prompt
 
+    # Commit before invalidating so replicas can't re-cache the old values
+    await session.commit()
+    await publish_guild_settings_changed(redis, gid)
     logger.info("guild_updated", guild_id=gid, plan=guild.plan)
     return GuildResponse.from_orm(guild)
 
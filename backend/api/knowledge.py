@@ -1,23 +1,54 @@
 """Knowledge CRUD API - /guilds/{guild_id}/knowledge."""
 
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from backend.db.session import get_session
-from backend.schemas.knowledge import KnowledgeCreate, KnowledgeUpdate, KnowledgeResponse
+from backend.dependencies import get_redis
+from backend.models.knowledge import Knowledge
+from backend.schemas.knowledge import (
+    KnowledgeCreate,
+    KnowledgeUpdate,
+    KnowledgeResponse,
+    KnowledgeImportResponse,
+)
+from backend.services.embedding_queue import enqueue_embedding
+from backend.services.embedding_service import EmbeddingUnavailableError
 from backend.services.guild_service import get_guild
 from backend.services.knowledge_service import (
     create_knowledge,
+    import_knowledge,
     get_knowledge_by_id,
     list_knowledge,
     update_knowledge,
     delete_knowledge,
 )
+from backend.services.vector_index import bump_knowledge_version
+from backend.utils.ndjson import iter_lines
 
 router = APIRouter(prefix="/guilds/{guild_id}/knowledge", tags=["knowledge"])
 
 
+async def _commit_and_invalidate(session: AsyncSession, redis: Redis, guild_id: int) -> None:
+    """
+    Commit a knowledge write, then invalidate vector indexes on all replicas.
+
+    The version bump must follow the commit, otherwise another replica could
+    rebuild from pre-commit rows and cache them under the new version.
+    """
+    await session.commit()
+    await bump_knowledge_version(redis, guild_id)
+
+
+async def _commit_knowledge(session: AsyncSession, redis: Redis, knowledge: Knowledge) -> None:
+    """Commit a created/updated entry; queue it for embedding if it is pending."""
+    await _commit_and_invalidate(session, redis, knowledge.guild_id)
+    if knowledge.embedding_status == "pending":
+        await enqueue_embedding(redis, [knowledge.id])
+
+
 @router.get("", response_model=list[KnowledgeResponse])
 async def list_guild_knowledge(
     guild_id: int,
@@ -36,6 +67,7 @@ async def list_guild_knowledge(
             title=k.title,
             content=k.content,
             created_at=k.created_at.isoformat() if k.created_at else "",
+            embedding_status=k.embedding_status,
         )
         for k in items
     ]
@@ -46,26 +78,67 @@ async def create_guild_knowledge(
     guild_id: int,
     body: KnowledgeCreate,
     session: AsyncSession = Depends(get_session),
+    redis: Redis = Depends(get_redis),
 ):
     """Create knowledge entry. Fails if plan limit exceeded."""
     guild = await get_guild(session, guild_id)
     if not guild:
         raise HTTPException(status_code=404, detail="Guild not found")
 
-    knowledge = await create_knowledge(
-        session, guild_id, body.title, body.content, plan=guild.plan
-    )
+    try:
+        knowledge = await create_knowledge(
+            session, guild_id, body.title, body.content, plan=guild.plan
+        )
+    except EmbeddingUnavailableError:
+        raise HTTPException(status_code=503, detail="Embedding service busy, please retry")
     if not knowledge:
         raise HTTPException(
             status_code=403,
             detail="Knowledge entry limit exceeded for your plan. Please upgrade.",
         )
+    await _commit_knowledge(session, redis, knowledge)
     return KnowledgeResponse(
         id=knowledge.id,
         guild_id=knowledge.guild_id,
         title=knowledge.title,
         content=knowledge.content,
         created_at=knowledge.created_at.isoformat() if knowledge.created_at else "",
+        embedding_status=knowledge.embedding_status,
+    )
+
+
+@router.post("/import", response_model=KnowledgeImportResponse)
+async def import_guild_knowledge(
+    guild_id: int,
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+    redis: Redis = Depends(get_redis),
+):
+    """
+    Bulk import knowledge entries.
+
+    Body is NDJSON (application/x-ndjson), one {"title": ..., "content": ...}
+    object per line, read as it streams in. Send the file as the raw body
+    (curl --data-binary), not multipart, which would be buffered whole.
+    Lines beyond the plan limit are reported, not inserted.
+    """
+    guild = await get_guild(session, guild_id)
+    if not guild:
+        raise HTTPException(status_code=404, detail="Guild not found")
+
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        raise HTTPException(
+            status_code=415, detail="Send NDJSON as the request body, not multipart"
+        )
+
+    results = await import_knowledge(
+        session, guild_id, iter_lines(request.stream()), plan=guild.plan
+    )
+    created = sum(1 for r in results if r.status == "created")
+    if created:
+        await _commit_and_invalidate(session, redis, guild_id)
+    return KnowledgeImportResponse(
+        created=created, rejected=len(results) - created, results=results
     )
 
 
@@ -89,6 +162,7 @@ async def get_guild_knowledge(
         title=knowledge.title,
         content=knowledge.content,
         created_at=knowledge.created_at.isoformat() if knowledge.created_at else "",
+        embedding_status=knowledge.embedding_status,
     )
 
 
@@ -98,23 +172,29 @@ async def update_guild_knowledge(
     knowledge_id: UUID,
     body: KnowledgeUpdate,
     session: AsyncSession = Depends(get_session),
+    redis: Redis = Depends(get_redis),
 ):
     """Update knowledge entry."""
     guild = await get_guild(session, guild_id)
     if not guild:
         raise HTTPException(status_code=404, detail="Guild not found")
 
-    knowledge = await update_knowledge(
-        session, knowledge_id, guild_id, title=body.title, content=body.content
-    )
+    try:
+        knowledge = await update_knowledge(
+            session, knowledge_id, guild_id, title=body.title, content=body.content
+        )
+    except EmbeddingUnavailableError:
+        raise HTTPException(status_code=503, detail="Embedding service busy, please retry")
     if not knowledge:
         raise HTTPException(status_code=404, detail="Knowledge not found")
+    await _commit_knowledge(session, redis, knowledge)
     return KnowledgeResponse(
         id=knowledge.id,
         guild_id=knowledge.guild_id,
         title=knowledge.title,
         content=knowledge.content,
         created_at=knowledge.created_at.isoformat() if knowledge.created_at else "",
+        embedding_status=knowledge.embedding_status,
     )
 
 
@@ -123,6 +203,7 @@ async def delete_guild_knowledge(
     guild_id: int,
     knowledge_id: UUID,
     session: AsyncSession = Depends(get_session),
+    redis: Redis = Depends(get_redis),
 ):
     """Delete knowledge entry."""
     guild = await get_guild(session, guild_id)
@@ -132,3 +213,4 @@ async def delete_guild_knowledge(
     deleted = await delete_knowledge(session, knowledge_id, guild_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="Knowledge not found")
+    await _commit_and_invalidate(session, redis, guild_id)
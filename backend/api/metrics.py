@@ -0,0 +1,35 @@
+"""Metrics endpoint - in-process cache and pipeline counters."""
+
+from typing import Any
+
+from fastapi import APIRouter
+
+from backend.services.embedding_cache import get_query_cache
+from backend.services.embedding_queue import get_embedding_workers
+from backend.services.guild_cache import get_guild_cache
+from backend.services.lexical_index import get_lexical_index
+from backend.services.message_buffer import get_message_flusher
+from backend.services.relay_scheduler import get_relay_scheduler
+from backend.services.retrieval_cache import get_retrieval_cache
+from backend.services.vector_index import get_vector_index
+from backend.utils.timing import get_relay_stage_stats
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("")
+async def get_metrics() -> dict[str, Any]:
+    """Counters for this backend worker (not aggregated across replicas)."""
+    workers = get_embedding_workers()
+    flusher = get_message_flusher()
+    return {
+        "guild_settings_cache": get_guild_cache().stats(),
+        "query_embedding_cache": get_query_cache().stats(),
+        "retrieval_cache": get_retrieval_cache().stats(),
+        "vector_index": get_vector_index().stats(),
+        "lexical_index": get_lexical_index().stats(),
+        "embedding_queue": await workers.stats() if workers else None,
+        "message_buffer": await flusher.stats() if flusher else None,
+        "relay_stages": get_relay_stage_stats().stats(),
+        "relay_scheduler": get_relay_scheduler().stats(),
+    }
@@ -1,102 +1,118 @@
 """Message relay endpoint - Phase 2 full flow."""
 
+import json
+from collections.abc import AsyncIterator
+from contextlib import aclosing
+
 import structlog
-from fastapi import APIRouter, Depends, HTTPException, Request
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import JSONResponse, StreamingResponse
+from redis.asyncio import Redis
 
-from backend.db.session import get_session
-from backend.schemas.relay import RelayRequest, RelayResponse
-from backend.services.guild_service import upsert_guild
-from backend.services.ticket_service import get_ticket, get_or_create_ticket
-from backend.services.limit_service import (
-    check_and_incr_concurrent,
-    decr_concurrent,
-    check_daily_ticket_limit,
-    check_monthly_tokens,
-)
-from backend.services.knowledge_service import search_knowledge
-from backend.services.message_service import add_message, get_last_messages
-from backend.services.prompt_builder import build_prompt_context
+from backend.config import config
+from backend.db.session import async_session_factory
+from backend.dependencies import get_redis
+from backend.schemas.relay import RelayJobResponse, RelayRequest, RelayResponse
+from backend.services.idempotency import IdempotencyTimeoutError
+from backend.services.relay_jobs import RelayQueueFullError, enqueue_relay_job, get_relay_job
+from backend.services.relay_service import relay_message as run_relay
+from backend.services.relay_service import relay_message_stream
 
 logger = structlog.get_logger()
 router = APIRouter(prefix="/relay", tags=["relay"])
 
 
-@router.post("", response_model=RelayResponse)
-async def relay_message(
-    payload: RelayRequest,
-    http_request: Request,
-    session: AsyncSession = Depends(get_session),
-):
+@router.post(
+    "",
+    response_model=RelayResponse,
+    responses={202: {"model": RelayJobResponse, "description": "Queued (RELAY_MODE=async)"}},
+)
+async def relay_message(payload: RelayRequest, redis: Redis = Depends(get_redis)):
     """
     Relay a message from Discord bot. Phase 2: limit checks, knowledge retrieval,
     prompt building. No AI call yet.
-    """
-    redis = getattr(http_request.app.state, "redis", None)
-    if not redis:
-        raise HTTPException(status_code=500, detail="Redis not initialized")
 
+    Retries with the same ``message_id`` get the first attempt's response.
+    With RELAY_MODE=async the message is queued for the relay workers and
+    the response is 202 with a job id to poll.
+    """
     guild_id = int(payload.guild_id)
     channel_id = int(payload.channel_id)
     try:
-        # 1. Upsert guild
-        guild = await upsert_guild(session, guild_id)
-        await session.flush()
+        if config.relay_mode == "async":
+            job_id = await enqueue_relay_job(redis, payload)
+            return JSONResponse(
+                status_code=202,
+                content=RelayJobResponse(job_id=job_id, status="queued").model_dump(),
+            )
+        # Only the in-process relay needs a DB connection (it commits itself)
+        async with async_session_factory() as session:
+            return await run_relay(payload, session, redis)
+    except RelayQueueFullError:
+        raise HTTPException(status_code=503, detail="Relay queue is full") from None
+    except IdempotencyTimeoutError:
+        raise HTTPException(
+            status_code=409, detail="Message is already being processed"
+        ) from None
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("relay_error", error=str(e), guild_id=guild_id, channel_id=channel_id)
+        raise HTTPException(status_code=500, detail="Internal server error") from e
+
 
-        # 2. Get or create ticket (check daily limit first if new ticket)
-        ticket = await get_ticket(session, guild_id, channel_id)
-        if ticket is None:
-            ok, msg = await check_daily_ticket_limit(redis, guild_id, guild.plan, True)
-            if not ok:
-                return RelayResponse(status="limit_exceeded", reply=msg)
-        ticket, _ = await get_or_create_ticket(session, guild_id, channel_id)
-        await session.flush()
+def _sse(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
 
-        # 3. Remaining limit checks
-        ok, msg = await check_monthly_tokens(redis, guild_id, guild.plan)
-        if not ok:
-            return RelayResponse(status="limit_exceeded", reply=msg)
 
-        ok, msg = await check_and_incr_concurrent(redis, guild_id, guild.plan)
-        if not ok:
-            return RelayResponse(status="limit_exceeded", reply=msg)
+async def _relay_events(payload: RelayRequest, redis: Redis) -> AsyncIterator[str]:
+    # The stream outlives request dependencies, so it owns its session; the
+    # pipeline is closed here (not by GC) when the client disconnects
+    try:
+        async with (
+            async_session_factory() as session,
+            aclosing(relay_message_stream(payload, session, redis)) as stream,
+        ):
+            async for item in stream:
+                if isinstance(item, RelayResponse):
+                    yield _sse("done", item.model_dump_json())
+                else:
+                    yield _sse("token", json.dumps({"text": item}))
+    except IdempotencyTimeoutError:
+        yield _sse("error", json.dumps({"detail": "Message is already being processed"}))
+    except Exception as e:
+        logger.error("relay_stream_error", error=str(e), guild_id=payload.guild_id)
+        yield _sse("error", json.dumps({"detail": "Internal server error"}))
 
-        try:
-            # 4. Store user message
-            await add_message(session, ticket.id, "user", payload.content)
-            await session.flush()
 
-            # 5. Build prompt context
-            knowledge_items = await search_knowledge(
-                session, guild_id, payload.content, top_k=3, plan=guild.plan
-            )
-            last_msgs = await get_last_messages(session, ticket.id, limit=8)
-            knowledge_chunks = [
-                {"title": k.title, "content": k.content} for k in knowledge_items
-            ]
-            message_history = [
-                {"role": m.role, "content": m.content} for m in last_msgs
-            ]
-            prompt_context = build_prompt_context(
-                guild.system_prompt or "",
-                knowledge_chunks,
-                message_history,
-            )
+@router.post("/stream")
+async def relay_message_sse(payload: RelayRequest, redis: Redis = Depends(get_redis)):
+    """
+    Streaming relay as server-sent events: ``token`` events carry reply text
+    as it is generated (``{"text": ...}``), then one ``done`` event carries the
+    RelayResponse, or an ``error`` event ``{"detail": ...}``. Limit and busy
+    replies arrive as ``done`` without tokens. Runs in this process, so with
+    RELAY_MODE=async it answers 409 and clients use POST /relay (job mode).
+    """
+    if config.relay_mode == "async":
+        raise HTTPException(
+            status_code=409, detail="Streaming is disabled with RELAY_MODE=async; use POST /relay"
+        )
+    return StreamingResponse(
+        _relay_events(payload, redis),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-            # 6. Phase 2 placeholder reply (no AI yet)
-            reply = "AI is thinking... (Phase 2 placeholder)"
-            await add_message(session, ticket.id, "assistant", reply)
-            await session.flush()
 
-            return RelayResponse(
-                status="ok",
-                reply=reply,
-                prompt_context=prompt_context,
-            )
-        finally:
-            await decr_concurrent(redis, guild_id)
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error("relay_error", error=str(e), guild_id=guild_id, channel_id=channel_id)
-        raise HTTPException(status_code=500, detail="Internal server error") from e
+@router.get("/jobs/{job_id}", response_model=RelayJobResponse)
+async def get_relay_job_status(
+    job_id: str,
+    redis: Redis = Depends(get_redis),
+    wait: float = Query(0, ge=0, description="Seconds to wait for a queued job to finish"),
+):
+    """Relay job status and result; long-polls up to ``wait`` seconds."""
+    job = await get_relay_job(redis, job_id, min(wait, config.relay_job_max_wait))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job
@@ -10,9 +10,9 @@ from backend.schemas.plans import PLAN_LIMITS
 from backend.schemas.usage import UsageResponse
 from backend.services.guild_service import get_guild
 from backend.services.limit_service import (
-    _redis_key_concurrent,
     _redis_key_daily_tickets,
     _redis_key_monthly_tokens,
+    count_active_leases,
 )
 
 router = APIRouter(prefix="/guilds/{guild_id}/usage", tags=["usage"])
@@ -30,7 +30,7 @@ async def get_guild_usage(
         raise HTTPException(status_code=404, detail="Guild not found")
 
     limits = PLAN_LIMITS.get(guild.plan.lower(), PLAN_LIMITS["free"])
-    concurrent = int(await redis.get(_redis_key_concurrent(guild_id)) or 0)
+    concurrent = await count_active_leases(redis, guild_id)
     monthly = int(await redis.get(_redis_key_monthly_tokens(guild_id)) or 0)
     daily_key = _redis_key_daily_tickets(guild_id)
     daily = int(await redis.get(daily_key) or 0)
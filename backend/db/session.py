@@ -13,8 +13,8 @@ engine = create_async_engine(
     config.database_url,
     echo=False,
     pool_pre_ping=True,
-    pool_size=5,
-    max_overflow=10,
+    pool_size=config.db_pool_size,
+    max_overflow=config.db_max_overflow,
 )
 
 async_session_factory = async_sessionmaker(
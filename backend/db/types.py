@@ -0,0 +1,68 @@
+"""Custom column types."""
+
+import struct
+
+import numpy as np
+from sqlalchemy import LargeBinary
+from sqlalchemy.types import TypeDecorator
+
+from backend.config import config
+
+# 8-byte header: 4-byte format tag + little-endian float32 scale. Keeps the
+# payload 8-byte aligned so float32 blobs decode zero-copy.
+_HEADER = struct.Struct("<4sf")
+_FLOAT32 = b"f32\x00"
+_INT8 = b"i8\x00\x00"
+
+
+def encode_embedding(vector: "list[float] | np.ndarray", fmt: str = "float32") -> bytes:
+    """
+    Pack an embedding as float32, or int8 with a per-vector scale.
+
+    int8 keeps one byte per dimension: values are divided by
+    ``max(|v|) / 127`` and rounded; decoding multiplies the scale back in.
+    """
+    v = np.asarray(vector, dtype=np.float32)
+    if fmt == "int8":
+        peak = float(np.max(np.abs(v))) if v.size else 0.0
+        scale = peak / 127 if peak > 0 else 1.0
+        q = np.clip(np.rint(v / scale), -127, 127).astype(np.int8)
+        return _HEADER.pack(_INT8, scale) + q.tobytes()
+    return _HEADER.pack(_FLOAT32, 1.0) + v.astype("<f4").tobytes()
+
+
+def decode_embedding(blob: bytes | memoryview) -> np.ndarray:
+    """Unpack an embedding blob into a float32 array (no copy for float32)."""
+    tag, scale = _HEADER.unpack_from(blob)
+    if tag == _INT8:
+        return np.frombuffer(blob, dtype=np.int8, offset=_HEADER.size).astype(np.float32) * scale
+    if tag == _FLOAT32:
+        return np.frombuffer(blob, dtype="<f4", offset=_HEADER.size)
+    raise ValueError(f"Unknown embedding format tag {tag!r}")
+
+
+class CompactEmbedding(TypeDecorator):
+    """
+    Embedding stored as ``bytea`` (float32 or int8, see EMBEDDING_STORAGE).
+
+    Binds lists or numpy arrays; loads as a read-only float32 numpy array.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return encode_embedding(value, config.embedding_storage)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return decode_embedding(value)
+
+    def compare_values(self, x, y):
+        # Default == on arrays is elementwise, which breaks change detection
+        if x is None or y is None:
+            return x is y
+        return np.array_equal(np.asarray(x, dtype=np.float32), np.asarray(y, dtype=np.float32))
@@ -19,8 +19,12 @@ from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 
 from backend.config import config
-from backend.api import health, relay, knowledge, usage, guilds
+from backend.api import health, relay, knowledge, usage, guilds, metrics
 from backend.db.session import async_session_factory, engine
+from backend.services.embedding_queue import start_embedding_workers
+from backend.services.embedding_service import get_embedding_batcher
+from backend.services.guild_cache import get_guild_cache
+from backend.services.message_buffer import MESSAGE_STREAM_KEY, start_message_flusher
 from backend.services.reset_service import run_daily_reset, run_monthly_reset
 
 # Structlog configuration
@@ -57,6 +61,7 @@ async def lifespan(app: FastAPI):
         raise
     app.state.redis = redis
     log.info("redis_connected")
+    await get_guild_cache().start(redis)
 
     # Run Alembic migrations
     try:
@@ -90,10 +95,25 @@ async def lifespan(app: FastAPI):
     app.state.scheduler = scheduler
     log.info("scheduler_started")
 
+    # Background embedding for knowledge saved with KNOWLEDGE_EMBED_MODE=async
+    embedding_workers = await start_embedding_workers(redis, async_session_factory)
+    log.info("embedding_workers_started", workers=embedding_workers.workers)
+
+    # Flush buffered messages (MESSAGE_WRITE_MODE=buffered, or left over from it)
+    message_flusher = None
+    if config.message_write_mode == "buffered" or await redis.exists(MESSAGE_STREAM_KEY):
+        message_flusher = await start_message_flusher(redis, async_session_factory)
+        log.info("message_flusher_started")
+
     yield
 
     # Shutdown
     scheduler.shutdown(wait=False)
+    if message_flusher is not None:
+        await message_flusher.close()
+    await embedding_workers.close()
+    await get_guild_cache().close()
+    await get_embedding_batcher().close()
     await redis.aclose()
     await engine.dispose()
     log.info("phase", msg="Shutdown complete")
@@ -119,6 +139,7 @@ app.include_router(guilds.router)
 app.include_router(knowledge.router)
 app.include_router(usage.router)
 app.include_router(relay.router)
+app.include_router(metrics.router)
 
 
 @app.get("/")
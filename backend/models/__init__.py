@@ -2,8 +2,9 @@
 
 from backend.models.guild import Guild
 from backend.models.knowledge import Knowledge
+from backend.models.knowledge_chunk import KnowledgeChunk
 from backend.models.ticket import Ticket
 from backend.models.usage_log import UsageLog
 from backend.models.message import Message
 
-__all__ = ["Guild", "Knowledge", "Ticket", "UsageLog", "Message"]
+__all__ = ["Guild", "Knowledge", "KnowledgeChunk", "Ticket", "UsageLog", "Message"]
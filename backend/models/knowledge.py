@@ -3,8 +3,8 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import BigInteger, DateTime, ForeignKey, String, Text, Float
-from sqlalchemy.dialects.postgresql import ARRAY, UUID as PGUUID
+from sqlalchemy import BigInteger, DateTime, ForeignKey, String, Text
+from sqlalchemy.dialects.postgresql import UUID as PGUUID
 from sqlalchemy.orm import Mapped, mapped_column
 
 from backend.db.base import Base
@@ -22,9 +22,12 @@ class Knowledge(Base):
         BigInteger, ForeignKey("guilds.id"), nullable=False
     )
     title: Mapped[str] = mapped_column(String(500), nullable=False)
+    # Embedded per passage, see KnowledgeChunk
     content: Mapped[str] = mapped_column(Text, nullable=False)
-    # Embedding: 384 dimensions for all-MiniLM-L6-v2
-    embedding: Mapped[list[float] | None] = mapped_column(ARRAY(Float), nullable=True)
+    # pending (queued for the embedding workers), ready or failed
+    embedding_status: Mapped[str] = mapped_column(
+        String(16), nullable=False, default="ready", server_default="ready"
+    )
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), nullable=False, default=datetime.utcnow
     )
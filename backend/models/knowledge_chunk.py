@@ -0,0 +1,39 @@
+"""KnowledgeChunk ORM model - embedded passages of a knowledge entry."""
+
+import uuid
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import BigInteger, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy.dialects.postgresql import UUID as PGUUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from backend.db.base import Base
+from backend.db.types import CompactEmbedding
+
+
+class KnowledgeChunk(Base):
+    """Overlapping passage of a knowledge entry with its own embedding."""
+
+    __tablename__ = "knowledge_chunks"
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        PGUUID(as_uuid=True), primary_key=True, default=uuid.uuid4
+    )
+    knowledge_id: Mapped[uuid.UUID] = mapped_column(
+        PGUUID(as_uuid=True), ForeignKey("knowledge.id", ondelete="CASCADE"), nullable=False
+    )
+    guild_id: Mapped[int] = mapped_column(
+        BigInteger, ForeignKey("guilds.id", ondelete="CASCADE"), nullable=False
+    )
+    position: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    content: Mapped[str] = mapped_column(Text, nullable=False)
+    # Embedding of "title\npassage" (384 dimensions for all-MiniLM-L6-v2)
+    embedding: Mapped[np.ndarray | None] = mapped_column(CompactEmbedding(), nullable=True)
+    # Model that produced the embedding; search ignores vectors from other models
+    embedding_model: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    # content_hash() of the embedded text; lets identical passages reuse the vector
+    content_hash: Mapped[str | None] = mapped_column(String(64), nullable=True, index=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, default=datetime.utcnow
+    )
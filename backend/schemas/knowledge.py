@@ -26,6 +26,25 @@ class KnowledgeResponse(BaseModel):
     title: str
     content: str
     created_at: str
+    # pending while KNOWLEDGE_EMBED_MODE=async workers embed it; then ready/failed
+    embedding_status: str = "ready"
 
     class Config:
         from_attributes = True
+
+
+class KnowledgeImportLine(BaseModel):
+    """Outcome of one line of a bulk import."""
+
+    line: int
+    status: str  # created | invalid | limit_exceeded | failed
+    id: UUID | None = None
+    error: str | None = None
+
+
+class KnowledgeImportResponse(BaseModel):
+    """Bulk import summary, one result per non-empty line."""
+
+    created: int
+    rejected: int
+    results: list[KnowledgeImportLine]
@@ -20,11 +20,21 @@ class PromptContext(BaseModel):
     system_prompt: str = ""
     knowledge_chunks: list[dict[str, Any]] = Field(default_factory=list)
     message_history: list[dict[str, str]] = Field(default_factory=list)
+    token_count: int = Field(0, description="Prompt tokens (system + knowledge + history)")
 
 
 class RelayResponse(BaseModel):
     """Response payload for message relay."""
 
-    status: str = Field(..., description="ok | limit_exceeded | error")
+    status: str = Field(..., description="ok | limit_exceeded | busy | error")
     reply: str = Field(..., description="AI response message")
     prompt_context: PromptContext | None = Field(None, description="Built prompt context")
+
+
+class RelayJobResponse(BaseModel):
+    """Status of a relay job (RELAY_MODE=async)."""
+
+    job_id: str = Field(..., description="Job id returned when the message was queued")
+    status: str = Field(..., description="queued | done | failed")
+    response: RelayResponse | None = Field(None, description="Relay result once done")
+    error: str | None = Field(None, description="Failure reason if failed")
@@ -0,0 +1,127 @@
+"""Query embedding cache - in-process LRU tier backed by a shared Redis tier."""
+
+import base64
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+import structlog
+from redis.asyncio import Redis
+
+from backend.config import config
+from backend.services.embedding_service import embed_text_async
+from backend.utils.embeddings import EMBEDDING_MODEL_NAME
+
+logger = structlog.get_logger(__name__)
+
+
+def normalize_query(text: str) -> str:
+    """Normalize query text so trivially different phrasings share a key."""
+    return " ".join(text.lower().split())
+
+
+def query_cache_key(text: str, model_name: str = EMBEDDING_MODEL_NAME) -> str:
+    """Hash of the model name and normalized query text."""
+    digest = hashlib.sha256(f"{model_name}\n{normalize_query(text)}".encode()).hexdigest()
+    return f"emb:q:{digest}"
+
+
+def _encode_vector(vector: list[float]) -> str:
+    """Pack a vector as base64 float32 (Redis client decodes responses)."""
+    return base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode()
+
+
+def _decode_vector(value: str) -> list[float]:
+    return np.frombuffer(base64.b64decode(value), dtype=np.float32).tolist()
+
+
+class QueryEmbeddingCache:
+    """
+    Two-tier cache of query embeddings.
+
+    Lookups hit a bounded per-process LRU first, then Redis (shared by all
+    backend replicas, entries expire after ``ttl`` seconds). Redis failures
+    are treated as misses so the cache never fails a relay.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl: int = 86400) -> None:
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._lru: OrderedDict[str, list[float]] = OrderedDict()
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    def _remember(self, key: str, vector: list[float]) -> None:
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    async def get(self, redis: Redis | None, text: str) -> list[float] | None:
+        """Return the cached embedding for text, or None on a miss."""
+        key = query_cache_key(text)
+        vector = self._lru.get(key)
+        if vector is not None:
+            self._lru.move_to_end(key)
+            self.local_hits += 1
+            return vector
+        if redis is not None:
+            try:
+                value = await redis.get(key)
+            except Exception as e:
+                logger.warning("query_cache_redis_get_failed", error=str(e))
+                value = None
+            if value:
+                vector = _decode_vector(value)
+                self._remember(key, vector)
+                self.redis_hits += 1
+                return vector
+        self.misses += 1
+        return None
+
+    async def set(self, redis: Redis | None, text: str, vector: list[float]) -> None:
+        """Store an embedding in both tiers."""
+        key = query_cache_key(text)
+        self._remember(key, vector)
+        if redis is not None:
+            try:
+                await redis.set(key, _encode_vector(vector), ex=self.ttl)
+            except Exception as e:
+                logger.warning("query_cache_redis_set_failed", error=str(e))
+
+    def stats(self) -> dict[str, int | float]:
+        """Hit/miss counters for the metrics endpoint."""
+        lookups = self.local_hits + self.redis_hits + self.misses
+        return {
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_rate": (self.local_hits + self.redis_hits) / lookups if lookups else 0.0,
+            "local_size": len(self._lru),
+        }
+
+
+# Global cache instance
+_cache: QueryEmbeddingCache | None = None
+
+
+def get_query_cache() -> QueryEmbeddingCache:
+    """Get or create the global query embedding cache."""
+    global _cache
+    if _cache is None:
+        _cache = QueryEmbeddingCache(
+            max_entries=config.query_cache_size,
+            ttl=config.query_cache_ttl,
+        )
+    return _cache
+
+
+async def embed_query(redis: Redis | None, text: str) -> list[float]:
+    """Embed a search query, serving repeats from the cache."""
+    cache = get_query_cache()
+    vector = await cache.get(redis, text)
+    if vector is None:
+        vector = await embed_text_async(text)
+        await cache.set(redis, text, vector)
+    return vector
@@ -0,0 +1,185 @@
+"""Redis-backed queue and background workers for asynchronous knowledge embedding."""
+
+import asyncio
+import uuid
+
+import structlog
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from backend.config import config
+from backend.services.embedding_service import EmbeddingUnavailableError
+from backend.services.knowledge_service import (
+    embed_pending,
+    list_unembedded_knowledge_ids,
+    mark_embedding_failed,
+)
+from backend.services.vector_index import bump_knowledge_version
+
+logger = structlog.get_logger(__name__)
+
+EMBED_QUEUE_KEY = "knowledge:embed_queue"
+
+
+async def enqueue_embedding(redis: Redis, knowledge_ids: list[uuid.UUID]) -> None:
+    """Queue pending knowledge entries for the embedding workers (after commit)."""
+    if knowledge_ids:
+        await redis.lpush(EMBED_QUEUE_KEY, *(str(k) for k in knowledge_ids))
+
+
+class EmbeddingQueueWorkers:
+    """
+    Pool of tasks that embed pending knowledge entries in batches.
+
+    Every backend replica runs a pool on the shared Redis list. An item popped
+    by a replica that dies before committing stays pending in the DB and is
+    re-queued when a pool starts; duplicate items are harmless because only
+    passages without an embedding are processed. Failed batches are marked
+    failed and retried with backoff up to EMBED_QUEUE_MAX_ATTEMPTS times;
+    entries still failed are re-queued at the next start.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        session_factory: async_sessionmaker[AsyncSession],
+        workers: int = 2,
+        batch_size: int = 16,
+    ) -> None:
+        self._redis = redis
+        self._session_factory = session_factory
+        self.workers = max(1, workers)
+        self.batch_size = max(1, batch_size)
+        self._tasks: list[asyncio.Task] = []
+        self._retries: set[asyncio.Task] = set()
+        self._attempts: dict[uuid.UUID, int] = {}
+        self.processed = 0
+        self.failed = 0
+        self.retries = 0
+
+    async def start(self) -> None:
+        """Re-queue entries left pending or failed by a previous run and start the workers."""
+        async with self._session_factory() as session:
+            pending = await list_unembedded_knowledge_ids(session)
+        await enqueue_embedding(self._redis, pending)
+        if pending:
+            logger.info("embed_queue_requeued", entries=len(pending))
+        self._tasks = [asyncio.create_task(self._run(i)) for i in range(self.workers)]
+
+    async def close(self) -> None:
+        """Stop the workers; unfinished entries stay pending (or failed) in the DB."""
+        tasks = [*self._tasks, *self._retries]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._retries.clear()
+
+    async def _next_batch(self) -> list[uuid.UUID]:
+        item = await self._redis.brpop(EMBED_QUEUE_KEY, timeout=1)
+        if item is None:
+            return []
+        ids = [item[1]]
+        if self.batch_size > 1:
+            ids.extend(await self._redis.rpop(EMBED_QUEUE_KEY, self.batch_size - 1) or [])
+        return list(dict.fromkeys(uuid.UUID(i) for i in ids))
+
+    async def _run(self, worker: int) -> None:
+        while True:
+            try:
+                ids = await self._next_batch()
+                if ids:
+                    await self._process(ids)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("embed_queue_worker_error", worker=worker, error=str(e))
+                await asyncio.sleep(1)
+
+    async def _process(self, ids: list[uuid.UUID]) -> None:
+        try:
+            async with self._session_factory() as session:
+                guild_ids = await embed_pending(session, ids)
+                await session.commit()
+        except EmbeddingUnavailableError as e:
+            # Model saturated (e.g. by relay traffic): requeue and back off
+            logger.warning("embed_queue_retry", entries=len(ids), error=str(e))
+            self.retries += 1
+            await enqueue_embedding(self._redis, ids)
+            await asyncio.sleep(1)
+            return
+        except Exception as e:
+            logger.error("embed_queue_batch_failed", entries=len(ids), error=str(e))
+            async with self._session_factory() as session:
+                await mark_embedding_failed(session, ids)
+                await session.commit()
+            self.failed += len(ids)
+            self._retry_later(ids)
+            return
+
+        for knowledge_id in ids:
+            self._attempts.pop(knowledge_id, None)
+        for guild_id in guild_ids:
+            await bump_knowledge_version(self._redis, guild_id)
+        self.processed += len(ids)
+
+    def _retry_later(self, ids: list[uuid.UUID]) -> None:
+        """Re-queue failed entries after an exponential backoff, within the attempt cap."""
+        retry = []
+        for knowledge_id in ids:
+            attempts = self._attempts.get(knowledge_id, 0) + 1
+            if attempts >= config.embed_queue_max_attempts:
+                # Left failed; the next start re-queues it
+                self._attempts.pop(knowledge_id, None)
+                continue
+            self._attempts[knowledge_id] = attempts
+            retry.append(knowledge_id)
+        if not retry:
+            return
+        attempts = max(self._attempts[k] for k in retry)
+        delay = config.embed_queue_retry_delay * 2 ** (attempts - 1)
+        logger.info("embed_queue_retry_scheduled", entries=len(retry), delay_s=delay)
+        task = asyncio.create_task(self._requeue_after(retry, delay))
+        self._retries.add(task)
+        task.add_done_callback(self._retries.discard)
+
+    async def _requeue_after(self, ids: list[uuid.UUID], delay: float) -> None:
+        await asyncio.sleep(delay)
+        try:
+            await enqueue_embedding(self._redis, ids)
+        except Exception as e:
+            logger.error("embed_queue_requeue_failed", entries=len(ids), error=str(e))
+
+    async def stats(self) -> dict[str, int]:
+        """Counters for the metrics endpoint (queue length is cluster-wide)."""
+        return {
+            "queued": int(await self._redis.llen(EMBED_QUEUE_KEY)),
+            "processed": self.processed,
+            "failed": self.failed,
+            "retries": self.retries,
+            "workers": len(self._tasks),
+        }
+
+
+# Global worker pool, started in the app lifespan
+_workers: EmbeddingQueueWorkers | None = None
+
+
+async def start_embedding_workers(
+    redis: Redis, session_factory: async_sessionmaker[AsyncSession]
+) -> EmbeddingQueueWorkers:
+    """Create and start the global embedding worker pool."""
+    global _workers
+    _workers = EmbeddingQueueWorkers(
+        redis,
+        session_factory,
+        workers=config.embed_queue_workers,
+        batch_size=config.embed_queue_batch,
+    )
+    await _workers.start()
+    return _workers
+
+
+def get_embedding_workers() -> EmbeddingQueueWorkers | None:
+    """The running embedding worker pool, if started."""
+    return _workers
@@ -0,0 +1,225 @@
+"""Embedding service - micro-batches concurrent embedding requests."""
+
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+import structlog
+
+from backend.config import config
+from backend.utils.embeddings import embed_texts
+
+logger = structlog.get_logger(__name__)
+
+
+class EmbeddingUnavailableError(RuntimeError):
+    """Raised when the embedding queue is full or a request times out."""
+
+
+def _make_executor(kind: str, workers: int) -> Executor:
+    """Create the pool that runs model inference off the event loop."""
+    if kind == "process":
+        # spawn: never fork a parent that may already hold torch threads
+        return ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        )
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embedding")
+
+
+class EmbeddingBatcher:
+    """
+    Gather concurrent embedding requests into batched model calls.
+
+    Callers enqueue a text and await a future. A background task drains the
+    queue, dispatching a batch of up to ``max_batch_size`` texts once it is
+    full or ``max_wait_ms`` has passed since its first request arrived.
+    Batches are encoded in a thread or process pool so inference never
+    blocks the event loop; at most ``workers`` batches run at once.
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        executor: str = "thread",
+        workers: int = 1,
+        queue_size: int = 256,
+        timeout: float = 10.0,
+    ) -> None:
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.executor_kind = executor if executor in ("thread", "process") else "thread"
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.timeout = timeout
+        self._executor: Executor | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._queue: asyncio.Queue[tuple[str, asyncio.Future]] | None = None
+        self._worker: asyncio.Task | None = None
+        self._stop: asyncio.Event | None = None
+        self._inflight: set[asyncio.Task] = set()
+
+    def _ensure_worker(self) -> asyncio.Queue[tuple[str, asyncio.Future]]:
+        """Start the pool and batching task on the running loop if needed."""
+        if self._executor is None:
+            self._executor = _make_executor(self.executor_kind, self.workers)
+            self._slots = asyncio.Semaphore(self.workers)
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+        if self._worker is None or self._worker.done():
+            self._stop = asyncio.Event()
+            self._worker = asyncio.create_task(self._run())
+        return self._queue
+
+    async def embed(self, text: str, timeout: float | None = None) -> list[float]:
+        """
+        Embed one text, batched with any concurrent callers.
+
+        Raises EmbeddingUnavailableError if the queue is full or no result
+        arrives within ``timeout`` seconds (defaults to the service timeout).
+        """
+        queue = self._ensure_worker()
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        try:
+            queue.put_nowait((text, future))
+        except asyncio.QueueFull:
+            raise EmbeddingUnavailableError("Embedding queue is full") from None
+        try:
+            return await asyncio.wait_for(future, timeout or self.timeout)
+        except asyncio.TimeoutError:
+            raise EmbeddingUnavailableError("Embedding request timed out") from None
+
+    async def embed_many(
+        self, texts: list[str], timeout: float | None = None
+    ) -> list[list[float]]:
+        """
+        Embed several texts; they share batches with other callers.
+
+        Large inputs are fed one batch at a time so they cannot overflow
+        the queue and starve interactive requests.
+        """
+        vectors: list[list[float]] = []
+        for start in range(0, len(texts), self.max_batch_size):
+            batch = texts[start : start + self.max_batch_size]
+            vectors.extend(await asyncio.gather(*(self.embed(t, timeout) for t in batch)))
+        return vectors
+
+    async def _collect(
+        self, queue: asyncio.Queue[tuple[str, asyncio.Future]], stop: asyncio.Event
+    ) -> list[tuple[str, asyncio.Future]]:
+        """
+        Wait for one request, then gather more until full or timed out.
+
+        Returns an empty batch once ``stop`` is set.
+        """
+        get = asyncio.ensure_future(queue.get())
+        stopped = asyncio.ensure_future(stop.wait())
+        await asyncio.wait({get, stopped}, return_when=asyncio.FIRST_COMPLETED)
+        stopped.cancel()
+        if not get.done():
+            get.cancel()
+            return []
+        batch = [get.result()]
+        try:
+            async with asyncio.timeout(self.max_wait):
+                while len(batch) < self.max_batch_size and not stop.is_set():
+                    batch.append(await queue.get())
+        except TimeoutError:
+            pass
+        return batch
+
+    async def _run(self) -> None:
+        """Background loop: collect batches and hand them to the pool."""
+        assert self._queue is not None and self._slots is not None and self._stop is not None
+        while not self._stop.is_set():
+            batch = await self._collect(self._queue, self._stop)
+            if self._stop.is_set():
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(RuntimeError("Embedding service shut down"))
+                return
+            await self._slots.acquire()
+            task = asyncio.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch: list[tuple[str, asyncio.Future]]) -> None:
+        """Encode one batch in the executor and resolve its futures."""
+        assert self._slots is not None
+        try:
+            # Callers that gave up (timed out) don't need a vector
+            pending = [(text, fut) for text, fut in batch if not fut.done()]
+            if not pending:
+                return
+            loop = asyncio.get_running_loop()
+            try:
+                vectors = await loop.run_in_executor(
+                    self._executor, embed_texts, [text for text, _ in pending]
+                )
+            except Exception as e:
+                logger.error("embedding_batch_failed", error=str(e), size=len(pending))
+                for _, fut in pending:
+                    if not fut.done():
+                        fut.set_exception(e)
+                return
+            for (_, fut), vector in zip(pending, vectors):
+                if not fut.done():
+                    fut.set_result(vector)
+            logger.debug("embedding_batch", size=len(pending))
+        finally:
+            self._slots.release()
+
+    async def close(self) -> None:
+        """Stop the batching task and pool; fail any requests still queued."""
+        if self._worker is not None:
+            # Signal rather than cancel: a cancel racing a queue.get() can be
+            # swallowed, leaving the task blocked on an empty queue
+            if self._stop is not None:
+                self._stop.set()
+            done, _ = await asyncio.wait({self._worker}, timeout=1.0)
+            if not done:
+                self._worker.cancel()
+                await asyncio.wait({self._worker}, timeout=1.0)
+            self._worker = None
+            self._stop = None
+        for task in list(self._inflight):
+            task.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._slots = None
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, fut = self._queue.get_nowait()
+                if not fut.done():
+                    fut.set_exception(RuntimeError("Embedding service shut down"))
+            self._queue = None
+
+
+# Global batcher instance
+_batcher: EmbeddingBatcher | None = None
+
+
+def get_embedding_batcher() -> EmbeddingBatcher:
+    """Get or create the global embedding batcher."""
+    global _batcher
+    if _batcher is None:
+        _batcher = EmbeddingBatcher(
+            max_batch_size=config.embedding_batch_size,
+            max_wait_ms=config.embedding_batch_wait_ms,
+            executor=config.embedding_executor,
+            workers=config.embedding_workers,
+            queue_size=config.embedding_queue_size,
+            timeout=config.embedding_timeout,
+        )
+    return _batcher
+
+
+async def embed_text_async(text: str) -> list[float]:
+    """Embed text through the shared micro-batcher."""
+    return await get_embedding_batcher().embed(text)
+
+
+async def embed_texts_async(texts: list[str]) -> list[list[float]]:
+    """Embed several texts through the shared micro-batcher."""
+    return await get_embedding_batcher().embed_many(texts)
@@ -0,0 +1,154 @@
+"""Per-process guild settings cache, invalidated across replicas via Redis pub/sub."""
+
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import structlog
+from redis.asyncio import Redis
+
+from backend.config import config
+
+logger = structlog.get_logger(__name__)
+
+GUILD_SETTINGS_CHANNEL = "guild_settings:invalidate"
+
+
+@dataclass(frozen=True)
+class GuildSettings:
+    """The guild fields the relay path needs."""
+
+    plan: str
+    system_prompt: str
+
+
+class GuildSettingsCache:
+    """
+    Bounded LRU of guild settings with a TTL.
+
+    Guild updates publish the guild id on GUILD_SETTINGS_CHANNEL; every
+    replica's listener drops its entry, so hits never touch the network.
+    The TTL bounds staleness should a message be missed (the cache is also
+    cleared whenever the subscription drops).
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 60.0) -> None:
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._entries: OrderedDict[int, tuple[float, GuildSettings]] = OrderedDict()
+        # Bumped on every invalidation; loads that raced one are not stored
+        self._generation = 0
+        self._listener: asyncio.Task | None = None
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.max_invalidation_lag = 0.0
+        self.last_invalidation_lag = 0.0
+
+    def get(self, guild_id: int) -> GuildSettings | None:
+        """Cached settings for guild, or None on a miss or expired entry."""
+        entry = self._entries.get(guild_id)
+        if entry is not None:
+            cached_at, settings = entry
+            if time.monotonic() - cached_at < self.ttl:
+                self._entries.move_to_end(guild_id)
+                self.hits += 1
+                return settings
+            del self._entries[guild_id]
+            self.expirations += 1
+        self.misses += 1
+        return None
+
+    def begin_load(self) -> int:
+        """Token to pass to set() after reading settings from the DB."""
+        return self._generation
+
+    def set(self, guild_id: int, settings: GuildSettings, token: int) -> None:
+        """Store settings unless an invalidation arrived since begin_load()."""
+        if token != self._generation:
+            return
+        self._entries[guild_id] = (time.monotonic(), settings)
+        self._entries.move_to_end(guild_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, guild_id: int) -> None:
+        """Drop this process's entry for a guild."""
+        self._generation += 1
+        self._entries.pop(guild_id, None)
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._entries.clear()
+
+    async def start(self, redis: Redis) -> None:
+        """Subscribe to invalidations from other replicas."""
+        self._listener = asyncio.create_task(self._listen(redis))
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
+
+    async def _listen(self, redis: Redis) -> None:
+        while True:
+            pubsub = redis.pubsub()
+            try:
+                await pubsub.subscribe(GUILD_SETTINGS_CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    guild_id, _, published_at = message["data"].partition(":")
+                    self.invalidate(int(guild_id))
+                    self.invalidations += 1
+                    if published_at:
+                        lag = max(0.0, time.time() - float(published_at))
+                        self.last_invalidation_lag = lag
+                        self.max_invalidation_lag = max(self.max_invalidation_lag, lag)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Invalidations may have been missed while disconnected
+                logger.warning("guild_cache_listener_failed", error=str(e))
+                self.clear()
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    def stats(self) -> dict[str, int | float]:
+        """Hit rate and staleness counters for the metrics endpoint."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "last_invalidation_lag_s": self.last_invalidation_lag,
+            "max_invalidation_lag_s": self.max_invalidation_lag,
+            "size": len(self._entries),
+        }
+
+
+async def publish_guild_settings_changed(redis: Redis, guild_id: int) -> None:
+    """Invalidate a guild's cached settings on all replicas. Call after commit."""
+    get_guild_cache().invalidate(guild_id)
+    await redis.publish(GUILD_SETTINGS_CHANNEL, f"{guild_id}:{time.time()}")
+
+
+# Global cache instance
+_cache: GuildSettingsCache | None = None
+
+
+def get_guild_cache() -> GuildSettingsCache:
+    """Get or create the global guild settings cache."""
+    global _cache
+    if _cache is None:
+        _cache = GuildSettingsCache(
+            max_entries=config.guild_cache_size,
+            ttl=config.guild_cache_ttl,
+        )
+    return _cache
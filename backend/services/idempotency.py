@@ -0,0 +1,93 @@
+"""Redis idempotency records - run a request once, replay its result to retries."""
+
+import asyncio
+import uuid
+from dataclasses import dataclass
+
+import structlog
+from redis.asyncio import Redis
+from redis.commands.core import AsyncScript
+
+from backend.config import config
+
+logger = structlog.get_logger(__name__)
+
+# Value of a record whose request is still running (followed by the owner token)
+_PENDING = "pending:"
+
+# KEYS: record; ARGV: pending value of the owner. Deletes only our own claim.
+_RELEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_release_script: AsyncScript | None = None
+
+
+class IdempotencyTimeoutError(RuntimeError):
+    """Raised when a duplicate gave up waiting for the original to finish."""
+
+
+def relay_idempotency_key(guild_id: int, message_id: str) -> str:
+    return f"g:{guild_id}:relay:{message_id}"
+
+
+@dataclass
+class IdempotencyClaim:
+    """
+    Result of claim_idempotency.
+
+    ``cached`` holds the stored result if the request already completed;
+    otherwise this caller owns the record and must complete() or release() it.
+    """
+
+    redis: Redis
+    key: str
+    token: str
+    cached: str | None = None
+
+    async def complete(self, result: str) -> None:
+        """Store the result for duplicates arriving within the TTL."""
+        await self.redis.set(self.key, result, ex=config.relay_idempotency_ttl)
+
+    async def release(self) -> None:
+        """Drop the claim after a failure so a retry runs the request again."""
+        global _release_script
+        if _release_script is None:
+            _release_script = self.redis.register_script(_RELEASE_LUA)
+        await _release_script(keys=[self.key], args=[_PENDING + self.token], client=self.redis)
+
+
+async def claim_idempotency(redis: Redis, key: str) -> IdempotencyClaim:
+    """
+    Claim ``key`` for this request, or wait for the request that holds it.
+
+    Returns a claim with ``cached`` set if the original completed. A claim
+    whose owner dies expires after RELAY_IDEMPOTENCY_PENDING_S, after which a
+    waiting duplicate takes over. Raises IdempotencyTimeoutError if the
+    original is still running after RELAY_IDEMPOTENCY_WAIT_S.
+    """
+    token = uuid.uuid4().hex
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + config.relay_idempotency_wait
+    delay = 0.05
+    waited = False
+    while True:
+        claimed = await redis.set(
+            key, _PENDING + token, nx=True, ex=int(config.relay_idempotency_pending)
+        )
+        if claimed:
+            return IdempotencyClaim(redis, key, token)
+        value = await redis.get(key)
+        if value is not None and not value.startswith(_PENDING):
+            if waited:
+                logger.info("idempotent_request_waited", key=key)
+            return IdempotencyClaim(redis, key, token, cached=value)
+        if loop.time() >= deadline:
+            raise IdempotencyTimeoutError(key)
+        # In flight elsewhere (or just released): poll with backoff
+        waited = True
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, 0.5)
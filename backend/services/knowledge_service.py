@@ -1,20 +1,202 @@
 """Knowledge service - CRUD and similarity search."""
 
+import asyncio
 import uuid
-from sqlalchemy import select
+from collections.abc import AsyncIterable
+from dataclasses import dataclass
+
+import numpy as np
+import structlog
+from pydantic import ValidationError
+from redis.asyncio import Redis
+from sqlalchemy import bindparam, delete, func, insert, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from backend.config import config
 from backend.models.knowledge import Knowledge
+from backend.models.knowledge_chunk import KnowledgeChunk
+from backend.schemas.knowledge import KnowledgeCreate, KnowledgeImportLine
 from backend.schemas.plans import PLAN_LIMITS
-from backend.utils.embeddings import embed_text, cosine_similarity
+from backend.services.embedding_cache import embed_query
+from backend.services.embedding_service import (
+    EmbeddingUnavailableError,
+    embed_texts_async,
+)
+from backend.services.lexical_index import get_lexical_index
+from backend.services.pgvector_search import (
+    pgvector_available,
+    search_pgvector,
+    sync_embedding_vecs,
+)
+from backend.services.retrieval_cache import get_retrieval_cache, retrieval_cache_key
+from backend.services.vector_index import get_knowledge_version, get_vector_index
+from backend.utils.bm25 import BM25Index, reciprocal_rank_fusion
+from backend.utils.chunking import split_passages
+from backend.utils.embeddings import content_hash
+from backend.utils.timing import stage
+
+logger = structlog.get_logger(__name__)
+
+
+@dataclass(frozen=True)
+class KnowledgePassage:
+    """A ranked passage of a knowledge entry, ready for the prompt."""
+
+    knowledge_id: uuid.UUID
+    title: str
+    content: str
+
+
+def passage_text(title: str, passage: str) -> str:
+    """Text embedded (and lexically indexed) for a passage."""
+    return f"{title}\n{passage}"
+
+
+def chunk_texts(title: str, content: str) -> list[tuple[str, str]]:
+    """Split content into passages; returns (passage, text to embed) pairs."""
+    passages = split_passages(
+        content, config.knowledge_chunk_words, config.knowledge_chunk_overlap
+    ) or [content]
+    return [(p, passage_text(title, p)) for p in passages]
+
+
+async def embed_passage_texts(
+    session: AsyncSession, texts: list[str]
+) -> tuple[list[np.ndarray | list[float]], list[str]]:
+    """
+    Embed texts, reusing stored vectors with the same content hash.
+
+    Hashes cover the exact embedded text and model id, so unchanged passages
+    and identical passages in any guild (pasted templates) skip the model.
+    Returns (vectors, hashes) aligned with ``texts``.
+    """
+    hashes = [content_hash(t) for t in texts]
+    known: dict[str, np.ndarray | list[float]] = {}
+    if hashes:
+        # One row per hash; popular templates may be stored in many guilds
+        matches = (
+            select(
+                KnowledgeChunk.content_hash,
+                KnowledgeChunk.embedding,
+                func.row_number().over(partition_by=KnowledgeChunk.content_hash).label("rn"),
+            )
+            .where(
+                KnowledgeChunk.content_hash.in_(set(hashes)),
+                KnowledgeChunk.embedding.is_not(None),
+            )
+            .subquery()
+        )
+        result = await session.execute(
+            select(matches.c.content_hash, matches.c.embedding).where(matches.c.rn == 1)
+        )
+        known = {row.content_hash: row.embedding for row in result.all()}
+
+    missing = {h: t for h, t in zip(hashes, texts) if h not in known}
+    if missing:
+        vectors = await embed_texts_async(list(missing.values()))
+        known.update(zip(missing.keys(), vectors))
+    if len(missing) < len(texts):
+        logger.debug(
+            "knowledge_embeddings_reused",
+            reused=len(texts) - len(missing),
+            embedded=len(missing),
+        )
+    return [known[h] for h in hashes], hashes
+
+
+async def build_chunks(session: AsyncSession, knowledge: Knowledge) -> list[KnowledgeChunk]:
+    """
+    Split a knowledge entry into passages (not yet added to the session).
+
+    Passages are embedded now, unless KNOWLEDGE_EMBED_MODE=async: then the
+    entry is marked pending and the embedding workers fill them in later.
+    """
+    pairs = chunk_texts(knowledge.title, knowledge.content)
+    if config.knowledge_embed_mode == "async":
+        knowledge.embedding_status = "pending"
+        return [
+            KnowledgeChunk(
+                knowledge_id=knowledge.id,
+                guild_id=knowledge.guild_id,
+                position=i,
+                content=passage,
+            )
+            for i, (passage, _) in enumerate(pairs)
+        ]
+
+    vectors, hashes = await embed_passage_texts(session, [text for _, text in pairs])
+    knowledge.embedding_status = "ready"
+    return [
+        KnowledgeChunk(
+            knowledge_id=knowledge.id,
+            guild_id=knowledge.guild_id,
+            position=i,
+            content=passage,
+            embedding=vector,
+            content_hash=digest,
+            embedding_model=config.embedding_model,
+        )
+        for i, ((passage, _), vector, digest) in enumerate(zip(pairs, vectors, hashes))
+    ]
+
+
+async def update_chunk_embeddings(
+    session: AsyncSession,
+    chunk_ids: list[uuid.UUID],
+    vectors: list[np.ndarray | list[float]],
+    hashes: list[str],
+) -> None:
+    """
+    Store new active-model vectors for existing passages (bulk UPDATE by id).
+
+    A Core executemany rather than the ORM bulk update, which checks matched
+    rows and raises StaleDataError for a passage deleted in the meantime;
+    here such ids simply match no row.
+    """
+    chunks = [
+        KnowledgeChunk(
+            id=chunk_id,
+            embedding=vector,
+            content_hash=digest,
+            embedding_model=config.embedding_model,
+        )
+        for chunk_id, vector, digest in zip(chunk_ids, vectors, hashes)
+    ]
+    table = KnowledgeChunk.__table__
+    await session.execute(
+        update(table).where(table.c.id == bindparam("b_id")),
+        [
+            {
+                "b_id": c.id,
+                "embedding": c.embedding,
+                "content_hash": c.content_hash,
+                "embedding_model": c.embedding_model,
+            }
+            for c in chunks
+        ],
+    )
+    await sync_embedding_vecs(session, chunks)
+
+
+async def replace_chunks(session: AsyncSession, knowledge: Knowledge) -> list[KnowledgeChunk]:
+    """Re-split a knowledge entry into passages, replacing old ones."""
+    # Embed (reusing the entry's own unchanged passages) before deleting them
+    chunks = await build_chunks(session, knowledge)
+    await session.execute(
+        delete(KnowledgeChunk).where(KnowledgeChunk.knowledge_id == knowledge.id)
+    )
+    session.add_all(chunks)
+    await session.flush()
+    await sync_embedding_vecs(session, chunks)
+    return chunks
 
 
 async def get_knowledge_count(session: AsyncSession, guild_id: int) -> int:
     """Count knowledge entries for guild."""
     result = await session.execute(
-        select(Knowledge).where(Knowledge.guild_id == guild_id)
+        select(func.count()).select_from(Knowledge).where(Knowledge.guild_id == guild_id)
     )
-    return len(result.scalars().all())
+    return result.scalar_one()
 
 
 async def create_knowledge(
@@ -30,18 +212,192 @@ async def create_knowledge(
     if count >= limits["knowledge_entries"]:
         return None
 
-    embedding = embed_text(f"{title}\n{content}")
     knowledge = Knowledge(
+        id=uuid.uuid4(),
         guild_id=guild_id,
         title=title,
         content=content,
-        embedding=embedding,
     )
+    # Embed before adding to the session so a busy model leaves nothing behind
+    chunks = await build_chunks(session, knowledge)
     session.add(knowledge)
     await session.flush()
+    session.add_all(chunks)
+    await session.flush()
+    await sync_embedding_vecs(session, chunks)
     return knowledge
 
 
+async def import_knowledge(
+    session: AsyncSession,
+    guild_id: int,
+    lines: AsyncIterable[str],
+    plan: str = "free",
+) -> list[KnowledgeImportLine]:
+    """
+    Bulk create knowledge from NDJSON lines ({"title": ..., "content": ...}).
+
+    The plan limit is checked once up front; accepted entries are embedded
+    and inserted KNOWLEDGE_IMPORT_BATCH_SIZE at a time with multi-row
+    inserts. Only created entries count against the limit, so lines of a
+    failed batch free their slots for later lines. Returns one result per
+    non-empty line. Caller commits.
+    """
+    count = await get_knowledge_count(session, guild_id)
+    limits = PLAN_LIMITS.get(plan.lower(), PLAN_LIMITS["free"])
+    remaining = max(0, limits["knowledge_entries"] - count)
+
+    results: list[KnowledgeImportLine] = []
+    batch: list[tuple[int, KnowledgeCreate]] = []
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            entry = KnowledgeCreate.model_validate_json(line)
+        except ValidationError as e:
+            err = e.errors()[0]
+            loc = ".".join(str(part) for part in err["loc"])
+            results.append(
+                KnowledgeImportLine(
+                    line=line_no,
+                    status="invalid",
+                    error=f"{loc}: {err['msg']}" if loc else err["msg"],
+                )
+            )
+            continue
+        # Slots are held by the open batch and given back if it fails
+        if remaining <= 0:
+            results.append(KnowledgeImportLine(line=line_no, status="limit_exceeded"))
+            continue
+        remaining -= 1
+        batch.append((line_no, entry))
+        if len(batch) >= config.knowledge_import_batch_size:
+            inserted = await _insert_import_batch(session, guild_id, batch)
+            remaining += sum(1 for r in inserted if r.status != "created")
+            results.extend(inserted)
+            batch = []
+    if batch:
+        results.extend(await _insert_import_batch(session, guild_id, batch))
+
+    results.sort(key=lambda r: r.line)
+    logger.info(
+        "knowledge_imported",
+        guild_id=guild_id,
+        lines=len(results),
+        created=sum(1 for r in results if r.status == "created"),
+    )
+    return results
+
+
+async def _insert_import_batch(
+    session: AsyncSession, guild_id: int, batch: list[tuple[int, KnowledgeCreate]]
+) -> list[KnowledgeImportLine]:
+    """Embed all passages of a batch in one call, then insert entries and chunks."""
+    knowledge_rows: list[dict] = []
+    chunk_rows: list[dict] = []
+    texts: list[str] = []
+    for _, entry in batch:
+        knowledge_id = uuid.uuid4()
+        knowledge_rows.append(
+            {"id": knowledge_id, "guild_id": guild_id, "title": entry.title, "content": entry.content}
+        )
+        for position, (passage, text) in enumerate(chunk_texts(entry.title, entry.content)):
+            chunk_rows.append(
+                {
+                    "id": uuid.uuid4(),
+                    "knowledge_id": knowledge_id,
+                    "guild_id": guild_id,
+                    "position": position,
+                    "content": passage,
+                }
+            )
+            texts.append(text)
+
+    try:
+        vectors, hashes = await embed_passage_texts(session, texts)
+    except EmbeddingUnavailableError as e:
+        logger.warning("knowledge_import_embedding_unavailable", guild_id=guild_id, error=str(e))
+        return [
+            KnowledgeImportLine(line=line_no, status="failed", error="Embedding service busy")
+            for line_no, _ in batch
+        ]
+    for row, vector, digest in zip(chunk_rows, vectors, hashes):
+        row["embedding"] = vector
+        row["content_hash"] = digest
+        row["embedding_model"] = config.embedding_model
+
+    await session.execute(insert(Knowledge), knowledge_rows)
+    await session.execute(insert(KnowledgeChunk), chunk_rows)
+    await sync_embedding_vecs(session, [KnowledgeChunk(**row) for row in chunk_rows])
+    return [
+        KnowledgeImportLine(line=line_no, status="created", id=row["id"])
+        for (line_no, _), row in zip(batch, knowledge_rows)
+    ]
+
+
+async def embed_pending(session: AsyncSession, knowledge_ids: list[uuid.UUID]) -> set[int]:
+    """
+    Fill in embeddings for pending entries (run by the embedding workers).
+
+    Entries whose passages are all embedded become ready (including retried
+    failed ones). Passages replaced by an edit in the meantime are simply
+    gone; their replacements stay pending until the edit's own queue item.
+    Returns the guild ids touched. Caller commits.
+    """
+    result = await session.execute(
+        select(KnowledgeChunk.id, KnowledgeChunk.guild_id, KnowledgeChunk.content, Knowledge.title)
+        .join(Knowledge, Knowledge.id == KnowledgeChunk.knowledge_id)
+        .where(
+            KnowledgeChunk.knowledge_id.in_(knowledge_ids),
+            KnowledgeChunk.embedding.is_(None),
+        )
+    )
+    rows = result.all()
+    if rows:
+        vectors, hashes = await embed_passage_texts(
+            session, [passage_text(row.title, row.content) for row in rows]
+        )
+        await update_chunk_embeddings(session, [row.id for row in rows], vectors, hashes)
+
+    still_pending = (
+        select(KnowledgeChunk.id)
+        .where(KnowledgeChunk.knowledge_id == Knowledge.id, KnowledgeChunk.embedding.is_(None))
+        .exists()
+    )
+    ready = await session.execute(
+        update(Knowledge)
+        .where(
+            Knowledge.id.in_(knowledge_ids),
+            Knowledge.embedding_status != "ready",
+            ~still_pending,
+        )
+        .values(embedding_status="ready")
+        .returning(Knowledge.guild_id)
+        .execution_options(synchronize_session=False)
+    )
+    return {row.guild_id for row in rows} | set(ready.scalars().all())
+
+
+async def mark_embedding_failed(session: AsyncSession, knowledge_ids: list[uuid.UUID]) -> None:
+    """Mark pending entries whose embedding failed. Caller commits."""
+    await session.execute(
+        update(Knowledge)
+        .where(Knowledge.id.in_(knowledge_ids), Knowledge.embedding_status == "pending")
+        .values(embedding_status="failed")
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def list_unembedded_knowledge_ids(session: AsyncSession) -> list[uuid.UUID]:
+    """Ids of all entries still waiting for the embedding workers, or failed."""
+    result = await session.execute(
+        select(Knowledge.id).where(Knowledge.embedding_status != "ready")
+    )
+    return list(result.scalars().all())
+
+
 async def get_knowledge_by_id(
     session: AsyncSession,
     knowledge_id: uuid.UUID,
@@ -72,15 +428,20 @@ async def update_knowledge(
     title: str | None = None,
     content: str | None = None,
 ) -> Knowledge | None:
-    """Update knowledge entry."""
+    """Update knowledge entry. Passages are re-embedded only if their text changed."""
     k = await get_knowledge_by_id(session, knowledge_id, guild_id)
     if not k:
         return None
-    if title is not None:
+    changed = False
+    if title is not None and title != k.title:
         k.title = title
-    if content is not None:
+        changed = True
+    if content is not None and content != k.content:
         k.content = content
-        k.embedding = embed_text(f"{k.title}\n{k.content}")
+        changed = True
+    if changed:
+        # Embedded text is "title\npassage", so title edits re-embed too
+        await replace_chunks(session, k)
     await session.flush()
     return k
 
@@ -104,22 +465,190 @@ async def search_knowledge(
     guild_id: int,
     query: str,
     top_k: int = 3,
-    plan: str = "free",
-) -> list[Knowledge]:
-    """Search knowledge by cosine similarity. Returns top_k entries."""
-    limit = PLAN_LIMITS.get(plan.lower(), PLAN_LIMITS["free"])["knowledge_entries"]
+    redis: Redis | None = None,
+) -> list[KnowledgePassage]:
+    """
+    Search knowledge passages. Returns top_k, best first.
+
+    With KNOWLEDGE_RETRIEVAL=hybrid, BM25 candidates from the guild's lexical
+    index are fused with vector candidates (reciprocal rank fusion); if the
+    lexical hit is decisive (see GuildLexicalIndex.is_decisive) the query is
+    not embedded at all. Passages still pending embedding (async writes) are
+    ranked by BM25 and fused the same way. Only the winning passages are loaded.
+
+    With ``redis``, rankings are cached per guild knowledge version (see
+    RetrievalCache), so repeated questions skip ranking entirely.
+    """
+    version: int | None = None
+    if redis is not None:
+        try:
+            version = await get_knowledge_version(redis, guild_id)
+        except Exception as e:
+            logger.warning("knowledge_version_read_failed", guild_id=guild_id, error=str(e))
+    if version is None:
+        ranked, _ = await _rank_passages(session, redis, guild_id, query, top_k, None)
+        return await load_passages(session, guild_id, ranked)
+
+    cache = get_retrieval_cache()
+    key = retrieval_cache_key(guild_id, version, query, top_k)
+    ranked = await cache.get(redis, key)
+    if ranked is None:
+        ranked, complete = await _rank_passages(session, redis, guild_id, query, top_k, version)
+        # Don't pin a ranking degraded by an unavailable embedding service
+        if complete:
+            await cache.set(redis, key, ranked)
+    return await load_passages(session, guild_id, ranked)
+
+
+async def _rank_passages(
+    session: AsyncSession,
+    redis: Redis | None,
+    guild_id: int,
+    query: str,
+    top_k: int,
+    version: int | None,
+) -> tuple[list[uuid.UUID], bool]:
+    """
+    Top passage ids for the query, best first (see search_knowledge), and
+    whether the ranking is complete (False if the query couldn't be embedded).
+    """
+    lexical: list[uuid.UUID] | None = None
+    vector_k = top_k
+    if config.knowledge_retrieval == "hybrid":
+        lexical_index = get_lexical_index()
+        with stage("lexical_index"):
+            bm25 = await lexical_index.get(session, redis, guild_id, version)
+        hits = bm25.search(query, config.hybrid_candidates)
+        if lexical_index.is_decisive(bm25, query, hits):
+            return [cid for cid, _ in hits[:top_k]], True
+        lexical = [cid for cid, _ in hits]
+        vector_k = max(top_k, config.hybrid_candidates)
+
+    ranked, pending = await _rank_by_vector(session, redis, guild_id, query, vector_k, version)
+    complete = ranked is not None
+    ranked = ranked or []
+    if lexical is None and pending:
+        # Passages awaiting embedding can only be matched lexically for now
+        lexical = await _rank_pending(session, guild_id, query, pending, vector_k)
+    if lexical is not None:
+        ranked = reciprocal_rank_fusion([ranked, lexical])
+    return ranked[:top_k], complete
+
+
+async def _rank_by_vector(
+    session: AsyncSession,
+    redis: Redis | None,
+    guild_id: int,
+    query: str,
+    top_k: int,
+    version: int | None = None,
+) -> tuple[list[uuid.UUID] | None, frozenset[uuid.UUID]]:
+    """
+    Rank passage ids by cosine similarity to the query.
+
+    With KNOWLEDGE_SEARCH_MODE=pgvector and the pgvector column present,
+    ranking runs in Postgres (HNSW index). Otherwise, or if that query fails,
+    it uses this process's cached vector index for the guild. The query is
+    embedded (via the query cache when ``redis`` is given) while the index
+    loads.
+
+    Also returns the guild's passages with no active-model embedding yet
+    (async writes, or a re-embed after an EMBEDDING_MODEL change). The
+    ranking is None if the query could not be embedded.
+    """
+    embedding = asyncio.create_task(_embed_query(redis, guild_id, query))
+    try:
+        if config.knowledge_search_mode == "pgvector" and await pgvector_available(session):
+            pending = await _pending_chunk_ids(session, guild_id)
+            query_embedding = await embedding
+            if query_embedding is None:
+                return None, pending
+            ranked = await search_pgvector(session, guild_id, query_embedding, top_k)
+            if ranked is not None:
+                return ranked, pending
+
+        with stage("vector_index"):
+            index, pending = await get_vector_index().get(session, redis, guild_id, version)
+        if not len(index):
+            return [], pending
+        query_embedding = await embedding
+        if query_embedding is None:
+            return None, pending
+        return [chunk_id for chunk_id, _ in index.top_k(query_embedding, top_k)], pending
+    finally:
+        # Not needed if the guild has no vectors (or a load failed)
+        embedding.cancel()
+
+
+async def _pending_chunk_ids(session: AsyncSession, guild_id: int) -> frozenset[uuid.UUID]:
+    result = await session.execute(
+        select(KnowledgeChunk.id).where(
+            KnowledgeChunk.guild_id == guild_id,
+            or_(
+                KnowledgeChunk.embedding.is_(None),
+                KnowledgeChunk.embedding_model.is_distinct_from(config.embedding_model),
+            ),
+        )
+    )
+    return frozenset(result.scalars().all())
+
+
+async def _rank_pending(
+    session: AsyncSession,
+    guild_id: int,
+    query: str,
+    pending: frozenset[uuid.UUID],
+    top_k: int,
+) -> list[uuid.UUID]:
+    """
+    BM25-rank passages still waiting for an embedding.
+
+    Only the newest KNOWLEDGE_PENDING_RANK_LIMIT are scored, so a large
+    backlog (e.g. a re-embed) doesn't make every search score all of it.
+    """
     result = await session.execute(
-        select(Knowledge).where(Knowledge.guild_id == guild_id)
+        select(KnowledgeChunk.id, KnowledgeChunk.content, Knowledge.title)
+        .join(Knowledge, Knowledge.id == KnowledgeChunk.knowledge_id)
+        .where(KnowledgeChunk.guild_id == guild_id, KnowledgeChunk.id.in_(pending))
+        .order_by(KnowledgeChunk.created_at.desc())
+        .limit(config.knowledge_pending_rank_limit)
     )
-    all_k = list(result.scalars().all())
-    if not all_k:
+    rows = result.all()
+    index = BM25Index([row.id for row in rows], [passage_text(row.title, row.content) for row in rows])
+    return [chunk_id for chunk_id, _ in index.search(query, top_k)]
+
+
+async def load_passages(
+    session: AsyncSession, guild_id: int, chunk_ids: list[uuid.UUID]
+) -> list[KnowledgePassage]:
+    """Load passage text and entry titles for ranked chunk ids, keeping order."""
+    if not chunk_ids:
         return []
+    result = await session.execute(
+        select(
+            KnowledgeChunk.id,
+            KnowledgeChunk.knowledge_id,
+            KnowledgeChunk.content,
+            Knowledge.title,
+        )
+        .join(Knowledge, Knowledge.id == KnowledgeChunk.knowledge_id)
+        .where(KnowledgeChunk.guild_id == guild_id, KnowledgeChunk.id.in_(chunk_ids))
+    )
+    by_id = {
+        row.id: KnowledgePassage(
+            knowledge_id=row.knowledge_id, title=row.title, content=row.content
+        )
+        for row in result.all()
+    }
+    return [by_id[cid] for cid in chunk_ids if cid in by_id]
+
 
-    query_embedding = embed_text(query)
-    scored = []
-    for k in all_k:
-        if k.embedding:
-            sim = cosine_similarity(query_embedding, k.embedding)
-            scored.append((sim, k))
-    scored.sort(key=lambda x: x[0], reverse=True)
-    return [k for _, k in scored[:top_k]]
+async def _embed_query(redis: Redis | None, guild_id: int, query: str) -> list[float] | None:
+    """Embed a search query; None if the embedding service is unavailable."""
+    try:
+        with stage("embed_query"):
+            return await embed_query(redis, query)
+    except EmbeddingUnavailableError as e:
+        # Degrade to no knowledge rather than failing the relay
+        logger.warning("knowledge_search_embedding_unavailable", guild_id=guild_id, error=str(e))
+        return None
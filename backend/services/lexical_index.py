@@ -0,0 +1,115 @@
+"""Per-guild BM25 index over knowledge passages for hybrid retrieval."""
+
+import uuid
+from collections import OrderedDict
+
+import structlog
+from redis.asyncio import Redis
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.config import config
+from backend.models.knowledge import Knowledge
+from backend.models.knowledge_chunk import KnowledgeChunk
+from backend.services.vector_index import get_knowledge_version
+from backend.utils.bm25 import BM25Index
+
+logger = structlog.get_logger(__name__)
+
+
+class GuildLexicalIndex:
+    """
+    LRU of per-guild BM25 indexes over passage text ("title\\npassage").
+
+    Like the vector index, entries are tagged with the guild's knowledge
+    version in Redis, so every knowledge write (which bumps the version)
+    causes a rebuild on the next lookup on every replica.
+    """
+
+    def __init__(self, max_guilds: int = 1024) -> None:
+        self.max_guilds = max(1, max_guilds)
+        self._entries: OrderedDict[int, tuple[int, BM25Index[uuid.UUID]]] = OrderedDict()
+        self.hits = 0
+        self.builds = 0
+        self.short_circuits = 0
+
+    async def get(
+        self,
+        session: AsyncSession,
+        redis: Redis | None,
+        guild_id: int,
+        version: int | None = None,
+    ) -> BM25Index[uuid.UUID]:
+        """
+        Return the guild's BM25 index, rebuilding it if stale or missing.
+
+        Pass ``version`` if the caller already read it from Redis.
+        """
+        if version is None and redis is not None:
+            try:
+                version = await get_knowledge_version(redis, guild_id)
+            except Exception as e:
+                logger.warning("lexical_index_version_failed", guild_id=guild_id, error=str(e))
+
+        entry = self._entries.get(guild_id)
+        if entry is not None and version is not None and entry[0] == version:
+            self._entries.move_to_end(guild_id)
+            self.hits += 1
+            return entry[1]
+
+        result = await session.execute(
+            select(KnowledgeChunk.id, KnowledgeChunk.content, Knowledge.title)
+            .join(Knowledge, Knowledge.id == KnowledgeChunk.knowledge_id)
+            .where(KnowledgeChunk.guild_id == guild_id)
+        )
+        rows = result.all()
+        index = BM25Index([row.id for row in rows], [f"{row.title}\n{row.content}" for row in rows])
+        self.builds += 1
+        if version is not None:
+            self._entries[guild_id] = (version, index)
+            self._entries.move_to_end(guild_id)
+            while len(self._entries) > self.max_guilds:
+                self._entries.popitem(last=False)
+        return index
+
+    def is_decisive(
+        self, index: BM25Index[uuid.UUID], query: str, hits: list[tuple[uuid.UUID, float]]
+    ) -> bool:
+        """
+        Whether lexical hits are clear enough to skip embedding the query.
+
+        True when the top passage contains an identifier-like query term
+        (error code, command, version) and outscores the runner-up by
+        HYBRID_LEXICAL_MARGIN.
+        """
+        if not hits:
+            return False
+        top_id, top_score = hits[0]
+        runner_up = hits[1][1] if len(hits) > 1 else 0.0
+        if top_score < config.hybrid_lexical_margin * runner_up:
+            return False
+        if not index.matched_identifiers(query, top_id):
+            return False
+        self.short_circuits += 1
+        return True
+
+    def stats(self) -> dict[str, int]:
+        """Counters for the metrics endpoint."""
+        return {
+            "hits": self.hits,
+            "builds": self.builds,
+            "short_circuits": self.short_circuits,
+            "guilds": len(self._entries),
+        }
+
+
+# Global index instance
+_index: GuildLexicalIndex | None = None
+
+
+def get_lexical_index() -> GuildLexicalIndex:
+    """Get or create the global per-guild lexical index."""
+    global _index
+    if _index is None:
+        _index = GuildLexicalIndex(max_guilds=config.lexical_index_max_guilds)
+    return _index
@@ -1,10 +1,102 @@
 """Limit service - Redis atomic limit checks."""
 
+import asyncio
+import uuid
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
 from datetime import datetime
+
+import structlog
 from redis.asyncio import Redis
+from redis.commands.core import AsyncScript
 
+from backend.config import config
 from backend.schemas.plans import PLAN_LIMITS
 
+logger = structlog.get_logger(__name__)
+
+# Rejection messages by AdmissionVerdict.reason
+LIMIT_MESSAGES = {
+    "daily_ticket_limit": "Daily ticket limit reached ({limit} per day). Please try again tomorrow.",
+    "monthly_token_limit": "Monthly token limit exceeded. Please upgrade your plan.",
+    "concurrent_limit": "Concurrent ticket limit reached. Please wait for existing tickets to complete.",
+}
+
+# Current time (ms) from the Redis server, so lease deadlines don't depend on
+# the clocks of the replicas and workers that set them
+_NOW_MS_LUA = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+"""
+
+# KEYS: daily tickets, monthly tokens, concurrency leases (sorted set)
+# ARGV: new ticket (0/1), daily limit, monthly token limit, concurrent limit,
+#       daily key TTL, lease TTL (ms), lease id, prompt tokens
+# Reclaims expired leases, checks every limit and only then takes slots, so a
+# rejection leaves no partial state. Returns {reason or "", daily, monthly, concurrent}.
+_ADMISSION_LUA = _NOW_MS_LUA + """
+redis.call('ZREMRANGEBYSCORE', KEYS[3], '-inf', now)
+local daily = tonumber(redis.call('GET', KEYS[1]) or '0')
+local monthly = tonumber(redis.call('GET', KEYS[2]) or '0')
+local concurrent = redis.call('ZCARD', KEYS[3])
+local new_ticket = ARGV[1] == '1'
+if new_ticket and daily >= tonumber(ARGV[2]) then
+    return {'daily_ticket_limit', daily, monthly, concurrent}
+end
+if monthly >= tonumber(ARGV[3]) or monthly + tonumber(ARGV[8]) > tonumber(ARGV[3]) then
+    return {'monthly_token_limit', daily, monthly, concurrent}
+end
+if concurrent >= tonumber(ARGV[4]) then
+    return {'concurrent_limit', daily, monthly, concurrent}
+end
+if new_ticket then
+    daily = redis.call('INCR', KEYS[1])
+    if daily == 1 then
+        redis.call('EXPIRE', KEYS[1], ARGV[5])
+    end
+end
+redis.call('ZADD', KEYS[3], now + tonumber(ARGV[6]), ARGV[7])
+redis.call('PEXPIRE', KEYS[3], ARGV[6])
+return {'', daily, monthly, concurrent + 1}
+"""
+
+# KEYS: leases; ARGV: lease id, lease TTL (ms)
+# Extends a lease that still exists; returns 0 if it was already reclaimed.
+_HEARTBEAT_LUA = _NOW_MS_LUA + """
+if not redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], 'XX', now + tonumber(ARGV[2]), ARGV[1])
+redis.call('PEXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+# KEYS: leases. Returns the number of unexpired leases.
+_COUNT_LEASES_LUA = _NOW_MS_LUA + """
+return redis.call('ZCOUNT', KEYS[1], '(' .. now, '+inf')
+"""
+
+_admission_script: AsyncScript | None = None
+_heartbeat_script: AsyncScript | None = None
+_count_leases_script: AsyncScript | None = None
+
+
+@dataclass(frozen=True)
+class AdmissionVerdict:
+    """Outcome of admit_relay, with the counters it saw (after increments)."""
+
+    allowed: bool
+    reason: str | None
+    message: str
+    daily_tickets: int
+    monthly_tokens: int
+    concurrent: int
+    # Concurrency lease held if allowed; keep it alive with hold_lease()
+    lease_id: str | None = None
+    # Monthly quota left when admitted (budget for the prompt)
+    monthly_tokens_left: int = 0
+
 
 def _get_limits(plan: str) -> dict:
     """Get plan limits, fallback to free."""
@@ -12,7 +104,8 @@ def _get_limits(plan: str) -> dict:
 
 
 def _redis_key_concurrent(guild_id: int) -> str:
-    return f"g:{guild_id}:concurrent"
+    # Sorted set: lease id -> deadline (epoch ms)
+    return f"g:{guild_id}:concurrent_leases"
 
 
 def _redis_key_daily_tickets(guild_id: int) -> str:
@@ -24,56 +117,111 @@ def _redis_key_monthly_tokens(guild_id: int) -> str:
     return f"g:{guild_id}:monthly_tokens"
 
 
-async def check_and_incr_concurrent(redis: Redis, guild_id: int, plan: str) -> tuple[bool, str]:
-    """
-    Check concurrent limit and increment if OK.
-    Returns (allowed, rejection_message).
+async def admit_relay(
+    redis: Redis, guild_id: int, plan: str, is_new_ticket: bool, tokens: int = 0
+) -> AdmissionVerdict:
     """
-    limits = _get_limits(plan)
-    key = _redis_key_concurrent(guild_id)
-    current = await redis.incr(key)
-    if current > limits["concurrent_tickets"]:
-        await redis.decr(key)
-        return False, "Concurrent ticket limit reached. Please wait for existing tickets to complete."
-    return True, ""
-
+    Check all plan limits for a relayed message in one EVALSHA.
 
-async def decr_concurrent(redis: Redis, guild_id: int) -> None:
-    """Decrement concurrent counter after request completes."""
-    key = _redis_key_concurrent(guild_id)
-    await redis.decr(key)
-
-
-async def check_daily_ticket_limit(
-    redis: Redis, guild_id: int, plan: str, is_new_ticket: bool
-) -> tuple[bool, str]:
-    """
-    Check daily ticket limit. Only applies when creating NEW ticket.
-    Returns (allowed, rejection_message).
+    If admitted, a concurrency lease (see hold_lease) and, for a new ticket,
+    a daily slot are taken atomically; if rejected, nothing is. ``tokens``
+    (the smallest prompt the message can be sent with) must still fit in the
+    monthly quota. Leases that passed their deadline (crashed requests) are
+    reclaimed first.
     """
-    if not is_new_ticket:
-        return True, ""
-
+    global _admission_script
+    if _admission_script is None:
+        _admission_script = redis.register_script(_ADMISSION_LUA)
     limits = _get_limits(plan)
-    key = _redis_key_daily_tickets(guild_id)
-    current = await redis.incr(key)
-    if current > limits["daily_ticket_limit"]:
-        await redis.decr(key)
-        return False, f"Daily ticket limit reached ({limits['daily_ticket_limit']} per day). Please try again tomorrow."
-    return True, ""
-
-
-async def check_monthly_tokens(redis: Redis, guild_id: int, plan: str) -> tuple[bool, str]:
+    lease_id = uuid.uuid4().hex
+    reason, daily, monthly, concurrent = await _admission_script(
+        keys=[
+            _redis_key_daily_tickets(guild_id),
+            _redis_key_monthly_tokens(guild_id),
+            _redis_key_concurrent(guild_id),
+        ],
+        args=[
+            1 if is_new_ticket else 0,
+            limits["daily_ticket_limit"],
+            limits["monthly_tokens"],
+            limits["concurrent_tickets"],
+            86400 * 2,
+            int(config.concurrency_lease_ttl * 1000),
+            lease_id,
+            tokens,
+        ],
+        client=redis,
+    )
+    return AdmissionVerdict(
+        allowed=not reason,
+        reason=reason or None,
+        message=LIMIT_MESSAGES[reason].format(limit=limits["daily_ticket_limit"]) if reason else "",
+        daily_tickets=int(daily),
+        monthly_tokens=int(monthly),
+        concurrent=int(concurrent),
+        lease_id=None if reason else lease_id,
+        monthly_tokens_left=max(0, limits["monthly_tokens"] - int(monthly)),
+    )
+
+
+async def _heartbeat(redis: Redis, guild_id: int, lease_id: str) -> None:
+    """Push the lease deadline forward every third of its TTL."""
+    global _heartbeat_script
+    if _heartbeat_script is None:
+        _heartbeat_script = redis.register_script(_HEARTBEAT_LUA)
+    ttl_ms = int(config.concurrency_lease_ttl * 1000)
+    while True:
+        await asyncio.sleep(config.concurrency_lease_ttl / 3)
+        try:
+            alive = await _heartbeat_script(
+                keys=[_redis_key_concurrent(guild_id)],
+                args=[lease_id, ttl_ms],
+                client=redis,
+            )
+        except Exception as e:
+            logger.warning("lease_heartbeat_failed", guild_id=guild_id, error=str(e))
+            continue
+        if not alive:
+            logger.warning("lease_reclaimed_while_held", guild_id=guild_id, lease_id=lease_id)
+            return
+
+
+async def release_lease(redis: Redis, guild_id: int, lease_id: str) -> None:
+    """Free a concurrency slot taken by admit_relay."""
+    await redis.zrem(_redis_key_concurrent(guild_id), lease_id)
+
+
+@asynccontextmanager
+async def hold_lease(redis: Redis, guild_id: int, lease_id: str) -> AsyncIterator[None]:
     """
-    Check monthly token limit.
-    Returns (allowed, rejection_message).
+    Keep a concurrency lease alive for the duration of the block, then free it.
+
+    If the process dies, the lease simply expires after CONCURRENCY_LEASE_TTL_S
+    and the next admission reclaims the slot.
     """
-    limits = _get_limits(plan)
-    key = _redis_key_monthly_tokens(guild_id)
-    current = int(await redis.get(key) or 0)
-    if current >= limits["monthly_tokens"]:
-        return False, "Monthly token limit exceeded. Please upgrade your plan."
-    return True, ""
+    heartbeat = asyncio.create_task(_heartbeat(redis, guild_id, lease_id))
+    try:
+        yield
+    finally:
+        heartbeat.cancel()
+        await asyncio.gather(heartbeat, return_exceptions=True)
+        await release_lease(redis, guild_id, lease_id)
+
+
+async def count_active_leases(redis: Redis, guild_id: int) -> int:
+    """Concurrency slots currently held (unexpired leases)."""
+    global _count_leases_script
+    if _count_leases_script is None:
+        _count_leases_script = redis.register_script(_COUNT_LEASES_LUA)
+    return int(
+        await _count_leases_script(keys=[_redis_key_concurrent(guild_id)], client=redis)
+    )
+
+
+async def release_daily_ticket(redis: Redis, guild_id: int) -> None:
+    """Give back a daily ticket slot taken for a ticket that was not created."""
+    key = _redis_key_daily_tickets(guild_id)
+    await redis.decr(key)
 
 
 async def sync_monthly_tokens_from_db(redis: Redis, guild_id: int, value: int) -> None:
@@ -0,0 +1,247 @@
+"""Write-behind buffer for conversation messages (Redis stream + batch flusher)."""
+
+import asyncio
+import json
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timezone
+
+import structlog
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from backend.config import config
+from backend.models.message import Message
+from backend.models.ticket import Ticket
+
+logger = structlog.get_logger(__name__)
+
+MESSAGE_STREAM_KEY = "messages:write_buffer"
+MESSAGE_GROUP = "message_writers"
+
+
+def _ticket_key(ticket_id: uuid.UUID) -> str:
+    # Hash: message id -> payload, for messages not yet flushed to Postgres
+    return f"t:{ticket_id}:buffered_messages"
+
+
+def _to_message(payload: str) -> Message:
+    data = json.loads(payload)
+    return Message(
+        id=uuid.UUID(data["id"]),
+        ticket_id=uuid.UUID(data["ticket_id"]),
+        role=data["role"],
+        content=data["content"],
+        created_at=datetime.fromisoformat(data["created_at"]),
+    )
+
+
+async def buffer_message(
+    redis: Redis,
+    ticket_id: uuid.UUID,
+    role: str,
+    content: str,
+    message_id: uuid.UUID | None = None,
+) -> Message | None:
+    """
+    Queue a message for the flusher instead of inserting it.
+
+    Returns the (transient) message, or None if the buffer is full, in which
+    case the caller should insert synchronously.
+    """
+    if await redis.xlen(MESSAGE_STREAM_KEY) >= config.message_buffer_max:
+        return None
+    msg = Message(
+        id=message_id or uuid.uuid4(),
+        ticket_id=ticket_id,
+        role=role,
+        content=content,
+        created_at=datetime.now(timezone.utc),
+    )
+    payload = json.dumps(
+        {
+            "id": str(msg.id),
+            "ticket_id": str(ticket_id),
+            "role": role,
+            "content": content,
+            "created_at": msg.created_at.isoformat(),
+        }
+    )
+    async with redis.pipeline(transaction=True) as pipe:
+        pipe.xadd(MESSAGE_STREAM_KEY, {"m": payload})
+        pipe.hset(_ticket_key(ticket_id), str(msg.id), payload)
+        pipe.expire(_ticket_key(ticket_id), 86400)
+        await pipe.execute()
+    return msg
+
+
+async def buffered_messages(redis: Redis, ticket_id: uuid.UUID) -> list[Message]:
+    """Messages of a ticket still waiting in the buffer, oldest first."""
+    payloads = await redis.hvals(_ticket_key(ticket_id))
+    return sorted((_to_message(p) for p in payloads), key=lambda m: m.created_at)
+
+
+class MessageBufferFlusher:
+    """
+    Background task that moves buffered messages into Postgres in batches.
+
+    Entries are read through a consumer group and acknowledged only after
+    their batch commits, so a crash leaves them pending; any replica's
+    flusher reclaims entries idle for ``claim_idle`` seconds. Inserts ignore
+    ids already stored, making redelivery harmless. Messages whose ticket
+    is not committed yet are retried the same way and dropped only after
+    ``orphan_after`` seconds (the ticket's transaction rolled back).
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        session_factory: async_sessionmaker[AsyncSession],
+        batch_size: int = 200,
+        interval: float = 0.2,
+        claim_idle: float = 30.0,
+        orphan_after: float = 600.0,
+    ) -> None:
+        self._redis = redis
+        self._session_factory = session_factory
+        self.batch_size = max(1, batch_size)
+        self.interval = interval
+        self.claim_idle = claim_idle
+        self.orphan_after = orphan_after
+        self._consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self._task: asyncio.Task | None = None
+        self.flushed = 0
+        self.batches = 0
+        self.orphans_dropped = 0
+
+    async def start(self) -> None:
+        """Create the consumer group if needed and start flushing."""
+        try:
+            await self._redis.xgroup_create(MESSAGE_STREAM_KEY, MESSAGE_GROUP, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop flushing; unacknowledged entries are reclaimed by the next flusher."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                # Entries left by crashed flushers or waiting for their ticket
+                claimed = await self._redis.xautoclaim(
+                    MESSAGE_STREAM_KEY,
+                    MESSAGE_GROUP,
+                    self._consumer,
+                    min_idle_time=int(self.claim_idle * 1000),
+                    start_id="0-0",
+                    count=self.batch_size,
+                )
+                entries = claimed[1]
+                if not entries:
+                    response = await self._redis.xreadgroup(
+                        MESSAGE_GROUP,
+                        self._consumer,
+                        {MESSAGE_STREAM_KEY: ">"},
+                        count=self.batch_size,
+                        block=int(self.interval * 1000),
+                    )
+                    entries = response[0][1] if response else []
+                if entries:
+                    await self._flush(entries)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("message_flush_error", error=str(e))
+                await asyncio.sleep(1)
+
+    async def _flush(self, entries: list[tuple[str, dict[str, str]]]) -> None:
+        messages = {entry_id: _to_message(fields["m"]) for entry_id, fields in entries}
+        async with self._session_factory() as session:
+            result = await session.execute(
+                select(Ticket.id).where(Ticket.id.in_({m.ticket_id for m in messages.values()}))
+            )
+            tickets = set(result.scalars().all())
+            ready = {eid: m for eid, m in messages.items() if m.ticket_id in tickets}
+            if ready:
+                await session.execute(
+                    pg_insert(Message).on_conflict_do_nothing(index_elements=[Message.id]),
+                    [
+                        {
+                            "id": m.id,
+                            "ticket_id": m.ticket_id,
+                            "role": m.role,
+                            "content": m.content,
+                            "created_at": m.created_at,
+                        }
+                        for m in ready.values()
+                    ],
+                )
+                await session.commit()
+
+        # Entry ids start with the XADD time in ms
+        now_ms = time.time() * 1000
+        orphans = [
+            eid
+            for eid, m in messages.items()
+            if eid not in ready and now_ms - int(eid.split("-")[0]) > self.orphan_after * 1000
+        ]
+        if orphans:
+            logger.warning("message_buffer_orphans_dropped", entries=len(orphans))
+        done = list(ready) + orphans
+        if not done:
+            return
+        async with self._redis.pipeline(transaction=False) as pipe:
+            pipe.xack(MESSAGE_STREAM_KEY, MESSAGE_GROUP, *done)
+            pipe.xdel(MESSAGE_STREAM_KEY, *done)
+            for eid in done:
+                pipe.hdel(_ticket_key(messages[eid].ticket_id), str(messages[eid].id))
+            await pipe.execute()
+        self.flushed += len(ready)
+        self.orphans_dropped += len(orphans)
+        self.batches += 1
+
+    async def stats(self) -> dict[str, int]:
+        """Counters for the metrics endpoint (buffered count is cluster-wide)."""
+        return {
+            "buffered": int(await self._redis.xlen(MESSAGE_STREAM_KEY)),
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "orphans_dropped": self.orphans_dropped,
+        }
+
+
+# Global flusher, started in the app lifespan
+_flusher: MessageBufferFlusher | None = None
+
+
+async def start_message_flusher(
+    redis: Redis, session_factory: async_sessionmaker[AsyncSession]
+) -> MessageBufferFlusher:
+    """Create and start the global message flusher."""
+    global _flusher
+    _flusher = MessageBufferFlusher(
+        redis,
+        session_factory,
+        batch_size=config.message_flush_batch,
+        interval=config.message_flush_interval_ms / 1000,
+        claim_idle=config.message_buffer_claim_s,
+        orphan_after=config.message_buffer_orphan_s,
+    )
+    await _flusher.start()
+    return _flusher
+
+
+def get_message_flusher() -> MessageBufferFlusher | None:
+    """The running message flusher, if started."""
+    return _flusher
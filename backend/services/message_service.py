@@ -2,10 +2,13 @@
 
 import uuid
 
+from redis.asyncio import Redis
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from backend.config import config
 from backend.models.message import Message
+from backend.services.message_buffer import buffer_message, buffered_messages
 
 
 async def add_message(
@@ -13,24 +16,61 @@ async def add_message(
     ticket_id: uuid.UUID,
     role: str,
     content: str,
+    message_id: uuid.UUID | None = None,
 ) -> Message:
     """Add message to ticket."""
-    msg = Message(ticket_id=ticket_id, role=role, content=content)
+    msg = Message(id=message_id or uuid.uuid4(), ticket_id=ticket_id, role=role, content=content)
     session.add(msg)
     await session.flush()
     return msg
 
 
+async def store_message(
+    session: AsyncSession,
+    redis: Redis | None,
+    ticket_id: uuid.UUID,
+    role: str,
+    content: str,
+    message_id: uuid.UUID | None = None,
+) -> Message:
+    """
+    Persist a message according to MESSAGE_WRITE_MODE.
+
+    In "buffered" mode the message goes to the write-behind buffer (see
+    MessageBufferFlusher) and reaches Postgres in a later batch; it falls
+    back to a direct insert when Redis is missing or the buffer is full.
+    """
+    if config.message_write_mode == "buffered" and redis is not None:
+        msg = await buffer_message(redis, ticket_id, role, content, message_id)
+        if msg is not None:
+            return msg
+    return await add_message(session, ticket_id, role, content, message_id)
+
+
 async def get_last_messages(
     session: AsyncSession,
     ticket_id: uuid.UUID,
     limit: int = 8,
+    redis: Redis | None = None,
 ) -> list[Message]:
-    """Get last N messages for ticket."""
+    """
+    Get last N messages for ticket, oldest first.
+
+    With ``redis``, messages still in the write-behind buffer are merged in.
+    """
+    # Buffer first: the flusher commits to the DB before removing from the
+    # buffer, so a message flushed between the two reads is seen in both
+    # (deduplicated) rather than in neither
+    buffered = await buffered_messages(redis, ticket_id) if redis is not None else []
     result = await session.execute(
         select(Message)
         .where(Message.ticket_id == ticket_id)
         .order_by(Message.created_at.desc())
         .limit(limit)
     )
-    return list(reversed(list(result.scalars().all())))
+    messages = list(result.scalars().all())
+    if buffered:
+        stored = {m.id for m in messages}
+        messages.extend(m for m in buffered if m.id not in stored)
+        messages.sort(key=lambda m: m.created_at, reverse=True)
+    return list(reversed(messages[:limit]))
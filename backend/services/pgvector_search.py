@@ -0,0 +1,119 @@
+"""pgvector search - ANN ranking of knowledge inside Postgres."""
+
+import uuid
+
+import structlog
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.config import config
+from backend.models.knowledge_chunk import KnowledgeChunk
+from backend.utils.embeddings import EMBEDDING_DIM
+
+logger = structlog.get_logger(__name__)
+
+# Whether migrations could add knowledge_chunks.embedding_vec (the vector
+# extension is optional). None = not checked yet in this process.
+_available: bool | None = None
+
+
+def vector_literal(vector: list[float]) -> str:
+    """Format a vector as a pgvector text literal."""
+    return "[" + ",".join(repr(float(v)) for v in vector) + "]"
+
+
+async def pgvector_available(session: AsyncSession) -> bool:
+    """Whether the embedding_vec column exists (checked once per process)."""
+    global _available
+    if _available is None:
+        result = await session.execute(
+            text(
+                "SELECT 1 FROM information_schema.columns "
+                "WHERE table_name = 'knowledge_chunks' AND column_name = 'embedding_vec'"
+            )
+        )
+        _available = result.scalar() is not None
+        logger.info("pgvector_detected", available=_available)
+    return _available
+
+
+async def sync_embedding_vecs(session: AsyncSession, chunks: list[KnowledgeChunk]) -> None:
+    """Mirror flushed chunk embeddings into the pgvector column, if present."""
+    if not chunks or not await pgvector_available(session):
+        return
+    await session.execute(
+        text(
+            "UPDATE knowledge_chunks SET embedding_vec = CAST(CAST(:vec AS TEXT) AS vector) "
+            "WHERE id = :id"
+        ),
+        [
+            {
+                # The column is vector(384); other-sized models use the memory index
+                "vec": (
+                    vector_literal(c.embedding)
+                    if c.embedding is not None and len(c.embedding) == EMBEDDING_DIM
+                    else None
+                ),
+                "id": c.id,
+            }
+            for c in chunks
+        ],
+    )
+
+
+async def search_pgvector(
+    session: AsyncSession,
+    guild_id: int,
+    query_embedding: list[float],
+    top_k: int,
+) -> list[uuid.UUID] | None:
+    """
+    Rank a guild's knowledge passages by cosine distance in Postgres.
+
+    The HNSW index is shared by all guilds and the guild filter is applied
+    to its candidates, so the scan is widened (hnsw.ef_search) and, on
+    pgvector 0.8+, continued until enough rows match (iterative scan).
+    Returns chunk ids, best first, or None if the query fails (e.g. the
+    extension was dropped) or finds fewer passages than the guild has, so
+    the caller can fall back to the in-process path.
+    """
+    distance = text(
+        "knowledge_chunks.embedding_vec <=> CAST(CAST(:q AS TEXT) AS vector)"
+    ).bindparams(q=vector_literal(query_embedding))
+    eligible = (
+        KnowledgeChunk.guild_id == guild_id,
+        KnowledgeChunk.embedding_model == config.embedding_model,
+        text("knowledge_chunks.embedding_vec IS NOT NULL"),
+    )
+    stmt = (
+        select(KnowledgeChunk.id, distance.label("distance"))
+        .where(*eligible)
+        .order_by(distance)
+        .limit(top_k)
+    )
+    ef_search = max(top_k, config.pgvector_ef_search)
+    try:
+        # Savepoint: a failed query must not abort the relay's transaction
+        async with session.begin_nested():
+            await session.execute(text(f"SET LOCAL hnsw.ef_search = {int(ef_search)}"))
+            try:
+                async with session.begin_nested():
+                    await session.execute(text("SET LOCAL hnsw.iterative_scan = relaxed_order"))
+            except Exception:
+                pass  # pgvector < 0.8: ef_search alone bounds the candidates
+            result = await session.execute(stmt)
+            # Iterative scans may return rows slightly out of order
+            rows = sorted(result.all(), key=lambda row: row.distance)
+            if len(rows) < top_k:
+                total = await session.execute(
+                    select(func.count()).select_from(KnowledgeChunk).where(*eligible)
+                )
+                if total.scalar_one() > len(rows):
+                    logger.warning(
+                        "pgvector_search_incomplete", guild_id=guild_id, found=len(rows)
+                    )
+                    return None
+            return [row.id for row in rows]
+    except Exception as e:
+        logger.warning("pgvector_search_failed", guild_id=guild_id, error=str(e))
+        return None
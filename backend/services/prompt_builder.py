@@ -1,16 +1,104 @@
-"""Prompt builder - system + knowledge + message history."""
+"""Prompt builder - system + knowledge + message history within a token budget."""
 
+from backend.config import config
 from backend.schemas.relay import PromptContext
+from backend.utils.tokens import count_tokens, truncate_tokens
+
+# Chat formatting overhead per message (role markers, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+# Don't bother including a knowledge passage cut below this many tokens
+MIN_KNOWLEDGE_TOKENS = 48
+
+
+def _knowledge_tokens(chunk: dict) -> int:
+    return count_tokens(chunk["title"]) + count_tokens(chunk["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def _message_tokens(message: dict[str, str]) -> int:
+    return count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def _cap_system(system_prompt: str) -> str:
+    return truncate_tokens(system_prompt, config.prompt_system_max_tokens)
+
+
+def _cap_message(content: str) -> str:
+    return truncate_tokens(content, config.prompt_message_max_tokens, keep_tail=True)
+
+
+def min_prompt_tokens(system_prompt: str, message: str) -> int:
+    """Tokens of the smallest prompt build_prompt_context can make for a message."""
+    return count_tokens(_cap_system(system_prompt)) + _message_tokens(
+        {"content": _cap_message(message)}
+    )
 
 
 def build_prompt_context(
     system_prompt: str,
     knowledge_chunks: list[dict],
     message_history: list[dict[str, str]],
+    budget: int | None = None,
 ) -> PromptContext:
-    """Build prompt context for Phase 3 AI call."""
+    """
+    Build prompt context for Phase 3 AI call, fitted to a token budget.
+
+    ``message_history`` is oldest first and ends with the message being
+    answered. By priority: the system prompt and the current message are
+    always kept (each truncated to its own cap, long messages losing their
+    middle), then knowledge (best first, up to PROMPT_KNOWLEDGE_SHARE of what
+    is left, the last passage truncated to fit) and history (newest first,
+    whole messages) share the rest; budget one side leaves unused goes to
+    the other. Defaults to PROMPT_TOKEN_BUDGET.
+    """
+    budget = config.prompt_token_budget if budget is None else budget
+    system_prompt = _cap_system(system_prompt)
+    history = [
+        {"role": m["role"], "content": _cap_message(m["content"])}
+        for m in message_history[-config.prompt_max_messages:]
+    ]
+    current, earlier = history[-1:], history[:-1]
+
+    used = count_tokens(system_prompt) + sum(_message_tokens(m) for m in current)
+    remaining = max(0, budget - used)
+    history_need = sum(_message_tokens(m) for m in earlier)
+    # Knowledge gets its share, plus whatever history doesn't need
+    knowledge_budget = max(
+        int(remaining * config.prompt_knowledge_share), remaining - history_need
+    )
+
+    knowledge: list[dict] = []
+    knowledge_used = 0
+    for chunk in knowledge_chunks:
+        tokens = _knowledge_tokens(chunk)
+        left = knowledge_budget - knowledge_used
+        if tokens > left:
+            content_budget = left - count_tokens(chunk["title"]) - MESSAGE_OVERHEAD_TOKENS
+            if content_budget >= MIN_KNOWLEDGE_TOKENS:
+                chunk = {**chunk, "content": truncate_tokens(chunk["content"], content_budget)}
+                knowledge.append(chunk)
+                knowledge_used += _knowledge_tokens(chunk)
+            break
+        knowledge.append(chunk)
+        knowledge_used += tokens
+
+    history_budget = remaining - knowledge_used
+    kept: list[dict[str, str]] = []
+    for message in reversed(earlier):
+        tokens = _message_tokens(message)
+        if tokens > history_budget:
+            break
+        kept.append(message)
+        history_budget -= tokens
+    kept.reverse()
+
+    messages = kept + current
     return PromptContext(
         system_prompt=system_prompt,
-        knowledge_chunks=knowledge_chunks,
-        message_history=message_history[-8:],  # last 8 messages
+        knowledge_chunks=knowledge,
+        message_history=messages,
+        token_count=(
+            count_tokens(system_prompt)
+            + knowledge_used
+            + sum(_message_tokens(m) for m in messages)
+        ),
     )
@@ -0,0 +1,125 @@
+"""Resumable re-embedding of knowledge passages after an EMBEDDING_MODEL change."""
+
+import asyncio
+import uuid
+from collections import deque
+from collections.abc import Sequence
+
+import structlog
+from redis.asyncio import Redis
+from sqlalchemy import Row, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from backend.config import config
+from backend.models.knowledge import Knowledge
+from backend.models.knowledge_chunk import KnowledgeChunk
+from backend.services.knowledge_service import (
+    embed_passage_texts,
+    passage_text,
+    update_chunk_embeddings,
+)
+from backend.services.vector_index import bump_knowledge_version
+
+logger = structlog.get_logger(__name__)
+
+
+def _redis_key_checkpoint(model: str) -> str:
+    return f"reembed:{model}:cursor"
+
+
+async def _next_page(
+    session: AsyncSession, model: str, after: uuid.UUID | None, limit: int
+) -> Sequence[Row]:
+    """Next passages (by id) whose stored vector came from another model."""
+    stmt = (
+        select(KnowledgeChunk.id, KnowledgeChunk.guild_id, KnowledgeChunk.content, Knowledge.title)
+        .join(Knowledge, Knowledge.id == KnowledgeChunk.knowledge_id)
+        .where(
+            KnowledgeChunk.embedding.is_not(None),
+            KnowledgeChunk.embedding_model.is_distinct_from(model),
+        )
+        .order_by(KnowledgeChunk.id)
+        .limit(limit)
+    )
+    if after is not None:
+        stmt = stmt.where(KnowledgeChunk.id > after)
+    result = await session.execute(stmt)
+    return result.all()
+
+
+async def _reembed_page(
+    session_factory: async_sessionmaker[AsyncSession], redis: Redis, page: Sequence[Row]
+) -> int:
+    async with session_factory() as session:
+        vectors, hashes = await embed_passage_texts(
+            session, [passage_text(row.title, row.content) for row in page]
+        )
+        # Passages deleted or replaced since the page was read simply match no row
+        await update_chunk_embeddings(session, [row.id for row in page], vectors, hashes)
+        await session.commit()
+    for guild_id in {row.guild_id for row in page}:
+        await bump_knowledge_version(redis, guild_id)
+    return len(page)
+
+
+async def reembed_knowledge(
+    session_factory: async_sessionmaker[AsyncSession],
+    redis: Redis,
+    batch_size: int = 256,
+    concurrency: int = 4,
+    restart: bool = False,
+) -> int:
+    """
+    Re-embed every passage whose vector was made by a model other than
+    EMBEDDING_MODEL. Returns the number of passages updated.
+
+    Passages are read by keyset pagination on id, so at most ``concurrency``
+    pages are held in memory regardless of table size. After each page
+    commits in order, its last id is checkpointed in Redis; a rerun resumes
+    from there (``restart`` ignores the checkpoint). Until a passage is
+    re-embedded, search ranks it lexically like a pending one.
+    """
+    model = config.embedding_model
+    key = _redis_key_checkpoint(model)
+    if restart:
+        await redis.delete(key)
+    checkpoint = await redis.get(key)
+    cursor = uuid.UUID(checkpoint) if checkpoint else None
+    if cursor is not None:
+        logger.info("reembed_resume", model=model, cursor=str(cursor))
+
+    slots = asyncio.Semaphore(max(1, concurrency))
+    inflight: deque[tuple[uuid.UUID, asyncio.Task[int]]] = deque()
+    total = 0
+
+    async def drain(wait: bool) -> None:
+        # Checkpoint only past pages whose predecessors have all committed
+        nonlocal total
+        while inflight and (wait or inflight[0][1].done()):
+            last_id, task = inflight.popleft()
+            total += await task
+            await redis.set(key, str(last_id))
+            logger.info("reembed_progress", model=model, passages=total, cursor=str(last_id))
+
+    try:
+        while True:
+            async with session_factory() as session:
+                page = await _next_page(session, model, cursor, batch_size)
+            if not page:
+                break
+            cursor = page[-1].id
+            await slots.acquire()
+            task = asyncio.create_task(_reembed_page(session_factory, redis, page))
+            task.add_done_callback(lambda _: slots.release())
+            inflight.append((cursor, task))
+            await drain(wait=False)
+        await drain(wait=True)
+    except BaseException:
+        for _, task in inflight:
+            task.cancel()
+        await asyncio.gather(*(task for _, task in inflight), return_exceptions=True)
+        raise
+
+    await redis.delete(key)
+    logger.info("reembed_complete", model=model, passages=total)
+    return total
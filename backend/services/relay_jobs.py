@@ -0,0 +1,201 @@
+"""Asynchronous relay jobs - Redis stream queue, result records and worker pool."""
+
+import asyncio
+import os
+import socket
+import uuid
+
+import structlog
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from backend.config import config
+from backend.schemas.relay import RelayJobResponse, RelayRequest
+from backend.services.idempotency import IdempotencyTimeoutError
+from backend.services.relay_service import relay_message
+
+logger = structlog.get_logger(__name__)
+
+RELAY_JOB_STREAM = "relay:jobs"
+RELAY_JOB_GROUP = "relay_workers"
+
+
+class RelayQueueFullError(RuntimeError):
+    """Raised when RELAY_JOB_QUEUE_MAX jobs are already waiting."""
+
+
+def _job_key(job_id: str) -> str:
+    return f"relay:job:{job_id}"
+
+
+def _job_channel(job_id: str) -> str:
+    return f"relay:job:{job_id}:done"
+
+
+def relay_job_id(payload: RelayRequest) -> str:
+    """Stable id for messages with a Discord id, so retries map to one job."""
+    if payload.message_id:
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, f"relay:{payload.guild_id}:{payload.message_id}"))
+    return str(uuid.uuid4())
+
+
+async def enqueue_relay_job(redis: Redis, payload: RelayRequest) -> str:
+    """
+    Queue a relay for the workers and return its job id.
+
+    A retry of an already queued message returns the existing job.
+    """
+    job_id = relay_job_id(payload)
+    if await redis.xlen(RELAY_JOB_STREAM) >= config.relay_job_queue_max:
+        raise RelayQueueFullError(job_id)
+    record = RelayJobResponse(job_id=job_id, status="queued").model_dump_json()
+    if await redis.set(_job_key(job_id), record, nx=True, ex=config.relay_job_ttl):
+        await redis.xadd(RELAY_JOB_STREAM, {"job_id": job_id, "payload": payload.model_dump_json()})
+    return job_id
+
+
+async def get_relay_job(redis: Redis, job_id: str, wait: float = 0) -> RelayJobResponse | None:
+    """
+    Current job record (None if unknown or expired).
+
+    With ``wait``, blocks up to that many seconds for a queued job to finish.
+    """
+    value = await redis.get(_job_key(job_id))
+    if value is None or wait <= 0:
+        return RelayJobResponse.model_validate_json(value) if value else None
+    job = RelayJobResponse.model_validate_json(value)
+    if job.status != "queued":
+        return job
+
+    pubsub = redis.pubsub()
+    try:
+        await pubsub.subscribe(_job_channel(job_id))
+        # Re-read after subscribing so a result stored in between isn't missed
+        value = await redis.get(_job_key(job_id))
+        job = RelayJobResponse.model_validate_json(value) if value else None
+        if job is None or job.status != "queued":
+            return job
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + wait
+        while (remaining := deadline - loop.time()) > 0:
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=remaining)
+            if message is not None:
+                return RelayJobResponse.model_validate_json(message["data"])
+        return job
+    finally:
+        await pubsub.aclose()
+
+
+async def _finish_job(redis: Redis, job: RelayJobResponse) -> None:
+    data = job.model_dump_json()
+    await redis.set(_job_key(job.job_id), data, ex=config.relay_job_ttl)
+    await redis.publish(_job_channel(job.job_id), data)
+
+
+class RelayWorkerPool:
+    """
+    Consumers that run queued relays (see run_relay_worker.py).
+
+    Each consumer handles one job at a time; jobs are acknowledged after
+    their result is stored, and jobs held by a dead worker for
+    ``claim_idle`` seconds are taken over by another. A job redelivered
+    after it finished is skipped, and the relay itself is idempotent per
+    Discord message id.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        session_factory: async_sessionmaker[AsyncSession],
+        concurrency: int = 8,
+        claim_idle: float = 60.0,
+    ) -> None:
+        self._redis = redis
+        self._session_factory = session_factory
+        self.concurrency = max(1, concurrency)
+        self.claim_idle = claim_idle
+        self._name = f"{socket.gethostname()}-{os.getpid()}"
+        self._tasks: list[asyncio.Task] = []
+        self.completed = 0
+        self.failed = 0
+
+    async def start(self) -> None:
+        """Create the consumer group if needed and start the consumers."""
+        try:
+            await self._redis.xgroup_create(RELAY_JOB_STREAM, RELAY_JOB_GROUP, id="0", mkstream=True)
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._tasks = [
+            asyncio.create_task(self._run(f"{self._name}-{i}")) for i in range(self.concurrency)
+        ]
+
+    async def close(self) -> None:
+        """Stop the consumers; unacknowledged jobs are reclaimed by other workers."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _next_job(self, consumer: str) -> tuple[str, dict[str, str]] | None:
+        claimed = await self._redis.xautoclaim(
+            RELAY_JOB_STREAM,
+            RELAY_JOB_GROUP,
+            consumer,
+            min_idle_time=int(self.claim_idle * 1000),
+            start_id="0-0",
+            count=1,
+        )
+        if claimed[1]:
+            return claimed[1][0]
+        response = await self._redis.xreadgroup(
+            RELAY_JOB_GROUP, consumer, {RELAY_JOB_STREAM: ">"}, count=1, block=1000
+        )
+        return response[0][1][0] if response else None
+
+    async def _run(self, consumer: str) -> None:
+        while True:
+            try:
+                entry = await self._next_job(consumer)
+                if entry is None:
+                    continue
+                entry_id, fields = entry
+                payload = RelayRequest.model_validate_json(fields["payload"])
+                if not await self._process(fields["job_id"], payload):
+                    continue
+                await self._redis.xack(RELAY_JOB_STREAM, RELAY_JOB_GROUP, entry_id)
+                await self._redis.xdel(RELAY_JOB_STREAM, entry_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("relay_worker_error", consumer=consumer, error=str(e))
+                await asyncio.sleep(1)
+
+    async def _process(self, job_id: str, payload: RelayRequest) -> bool:
+        """Run one job and store its result; False leaves it for redelivery."""
+        current = await get_relay_job(self._redis, job_id)
+        if current is not None and current.status != "queued":
+            return True
+        try:
+            async with self._session_factory() as session:
+                response = await relay_message(payload, session, self._redis)
+                await session.commit()
+        except IdempotencyTimeoutError:
+            # Same message still running elsewhere: retry after claim_idle,
+            # when its cached response can be replayed
+            logger.warning("relay_job_duplicate_in_flight", job_id=job_id)
+            return False
+        except Exception as e:
+            logger.error("relay_job_failed", job_id=job_id, guild_id=payload.guild_id, error=str(e))
+            self.failed += 1
+            await _finish_job(
+                self._redis,
+                RelayJobResponse(job_id=job_id, status="failed", error="Internal server error"),
+            )
+            return True
+        self.completed += 1
+        await _finish_job(
+            self._redis, RelayJobResponse(job_id=job_id, status="done", response=response)
+        )
+        return True
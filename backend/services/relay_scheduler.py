@@ -0,0 +1,171 @@
+"""Plan-aware weighted-fair scheduler for relay pipeline slots."""
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+import structlog
+
+from backend.config import config
+from backend.schemas.plans import PLAN_LIMITS
+from backend.utils.timing import stage
+
+logger = structlog.get_logger(__name__)
+
+BUSY_MESSAGE = "We're handling a lot of requests right now. Please try again in a moment."
+
+
+class RelaySchedulerBusyError(RuntimeError):
+    """Raised when a relay waited longer than RELAY_QUEUE_TIMEOUT_S for a slot."""
+
+
+def parse_plan_weights(spec: str) -> dict[str, float]:
+    """Parse "free:1,pro:4" into weights for every plan (missing plans get 1)."""
+    weights = {plan: 1.0 for plan in PLAN_LIMITS}
+    for item in spec.split(","):
+        plan, _, weight = item.strip().partition(":")
+        if plan and weight:
+            weights[plan.strip().lower()] = max(float(weight), 0.01)
+    return weights
+
+
+class _PlanStats:
+    def __init__(self, window: int = 512) -> None:
+        self.admitted = 0
+        self.timeouts = 0
+        self.waits: deque[float] = deque(maxlen=window)
+
+
+class RelayScheduler:
+    """
+    Limits relays running in this process to ``capacity`` and orders waiters.
+
+    When all slots are busy, waiters queue per plan and per guild. Freed
+    slots go to plans by stride scheduling (a plan with weight 4 is served
+    four times as often as one with weight 1 while both have waiters), and
+    within a plan guilds take turns, so one guild's burst can't starve its
+    neighbours. A plan that was idle gets no banked credit when it returns.
+    Waiters give up after ``timeout`` seconds, so under sustained overload
+    low-weight plans are shed first.
+    """
+
+    def __init__(self, capacity: int, weights: dict[str, float], timeout: float) -> None:
+        self.capacity = max(1, capacity)
+        self.weights = weights
+        self.timeout = timeout
+        self._inflight = 0
+        self._queues: dict[str, OrderedDict[int, deque[asyncio.Future]]] = {
+            plan: OrderedDict() for plan in weights
+        }
+        self._depth = {plan: 0 for plan in weights}
+        self._pass = {plan: 0.0 for plan in weights}
+        self._vtime = 0.0
+        self._stats = {plan: _PlanStats() for plan in weights}
+
+    def _plan(self, plan: str) -> str:
+        plan = plan.lower()
+        return plan if plan in self._queues else "free"
+
+    @asynccontextmanager
+    async def slot(self, plan: str, guild_id: int) -> AsyncIterator[None]:
+        """Hold one relay slot, waiting for it in weighted-fair order."""
+        plan = self._plan(plan)
+        started = time.perf_counter()
+        with stage("queue"):
+            if self._inflight < self.capacity and not any(self._depth.values()):
+                self._inflight += 1
+            else:
+                await self._wait(plan, guild_id)
+        stats = self._stats[plan]
+        stats.admitted += 1
+        stats.waits.append((time.perf_counter() - started) * 1000)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _wait(self, plan: str, guild_id: int) -> None:
+        queue = self._queues[plan]
+        if not queue:
+            # Idle plans don't accumulate credit
+            self._pass[plan] = max(self._pass[plan], self._vtime)
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        queue.setdefault(guild_id, deque()).append(future)
+        self._depth[plan] += 1
+        try:
+            await asyncio.wait_for(future, self.timeout)
+        except BaseException as e:
+            if future.done() and not future.cancelled():
+                # The slot was handed over as we gave up; pass it on
+                self._release()
+            else:
+                self._remove(plan, guild_id, future)
+            if isinstance(e, asyncio.TimeoutError):
+                self._stats[plan].timeouts += 1
+                logger.warning("relay_queue_timeout", plan=plan, guild_id=guild_id)
+                raise RelaySchedulerBusyError(plan) from None
+            raise
+
+    def _remove(self, plan: str, guild_id: int, future: asyncio.Future) -> None:
+        waiters = self._queues[plan].get(guild_id)
+        if waiters is None or future not in waiters:
+            return
+        waiters.remove(future)
+        self._depth[plan] -= 1
+        if not waiters:
+            del self._queues[plan][guild_id]
+
+    def _release(self) -> None:
+        """Hand the freed slot to the next waiter, or return it to the pool."""
+        while True:
+            active = [plan for plan, queue in self._queues.items() if queue]
+            if not active:
+                self._inflight -= 1
+                return
+            plan = min(active, key=lambda p: self._pass[p])
+            queue = self._queues[plan]
+            guild_id, waiters = next(iter(queue.items()))
+            future = waiters.popleft()
+            if waiters:
+                queue.move_to_end(guild_id)
+            else:
+                del queue[guild_id]
+            self._depth[plan] -= 1
+            self._vtime = self._pass[plan]
+            self._pass[plan] += 1 / self.weights[plan]
+            if not future.done():
+                future.set_result(None)
+                return
+
+    def stats(self) -> dict[str, object]:
+        """Queue depth and wait times per plan for the metrics endpoint."""
+        plans = {}
+        for plan, stats in self._stats.items():
+            waits = sorted(stats.waits)
+            plans[plan] = {
+                "weight": self.weights[plan],
+                "queued": self._depth[plan],
+                "admitted": stats.admitted,
+                "timeouts": stats.timeouts,
+                "wait_mean_ms": round(sum(waits) / len(waits), 2) if waits else 0.0,
+                "wait_p95_ms": round(waits[int(0.95 * (len(waits) - 1))], 2) if waits else 0.0,
+            }
+        return {"capacity": self.capacity, "inflight": self._inflight, "plans": plans}
+
+
+# Global scheduler instance
+_scheduler: RelayScheduler | None = None
+
+
+def get_relay_scheduler() -> RelayScheduler:
+    """Get or create the global relay scheduler."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = RelayScheduler(
+            capacity=config.relay_max_inflight,
+            weights=parse_plan_weights(config.relay_plan_weights),
+            timeout=config.relay_queue_timeout,
+        )
+    return _scheduler
@@ -0,0 +1,235 @@
+"""Relay service - the message relay pipeline shared by the API and relay workers."""
+
+import uuid
+from collections.abc import AsyncIterator
+from contextlib import aclosing
+
+import structlog
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.config import config
+from backend.models.message import Message
+from backend.schemas.relay import RelayRequest, RelayResponse
+from backend.services.idempotency import claim_idempotency, relay_idempotency_key
+from backend.services.knowledge_service import KnowledgePassage, search_knowledge
+from backend.services.limit_service import (
+    admit_relay,
+    hold_lease,
+    release_daily_ticket,
+)
+from backend.services.message_service import get_last_messages, store_message
+from backend.services.prompt_builder import build_prompt_context, min_prompt_tokens
+from backend.services.reply_generator import generate_reply
+from backend.services.relay_scheduler import (
+    BUSY_MESSAGE,
+    RelaySchedulerBusyError,
+    get_relay_scheduler,
+)
+from backend.services.ticket_service import RelayTarget, create_ticket, resolve_relay_target
+from backend.utils.timing import get_relay_stage_stats, mark, stage, track_stages
+
+logger = structlog.get_logger(__name__)
+
+
+async def _search_knowledge(
+    session: AsyncSession, guild_id: int, query: str, redis: Redis
+) -> list[KnowledgePassage]:
+    with stage("knowledge"):
+        return await search_knowledge(session, guild_id, query, top_k=3, redis=redis)
+
+
+async def _load_history(
+    session: AsyncSession, ticket_id: uuid.UUID, limit: int, redis: Redis, exclude: uuid.UUID
+) -> list[Message]:
+    """
+    Ticket history without message ``exclude``.
+
+    Buffered messages are included; the message being relayed may or may not
+    be visible yet depending on the write mode, so it is always left out.
+    """
+    with stage("history"):
+        messages = await get_last_messages(session, ticket_id, limit=limit + 1, redis=redis)
+    return [m for m in messages if m.id != exclude][-limit:]
+
+
+async def _store_message(
+    session: AsyncSession, redis: Redis, ticket_id: uuid.UUID, content: str, message_id: uuid.UUID
+) -> None:
+    with stage("store_message"):
+        await store_message(session, redis, ticket_id, "user", content, message_id)
+
+
+async def _relay(
+    payload: RelayRequest, session: AsyncSession, redis: Redis
+) -> AsyncIterator[str | RelayResponse]:
+    """
+    Run the relay pipeline for one message: limit checks, knowledge
+    retrieval, prompt building, reply generation.
+
+    Yields reply text pieces as they are generated, then the final
+    RelayResponse. After the guild is resolved (and the session committed,
+    so no connection is held while queued), the rest runs in a slot of the
+    plan-aware RelayScheduler; if none frees up in time the reply is
+    "busy". The whole pipeline uses the one ``session`` connection; per-stage
+    timings are logged and exposed on /metrics.
+    """
+    guild_id = int(payload.guild_id)
+    channel_id = int(payload.channel_id)
+    with track_stages() as timer:
+        # 1. Upsert guild and find the open ticket (one statement)
+        with stage("resolve"):
+            target = await resolve_relay_target(session, guild_id, channel_id)
+            # Give the connection back while waiting for a slot; the guild
+            # upsert is all that was written
+            await session.commit()
+        try:
+            async with get_relay_scheduler().slot(target.plan, guild_id):
+                async for item in _relay_scheduled(payload, session, redis, target):
+                    if isinstance(item, RelayResponse):
+                        response = item
+                    else:
+                        yield item
+        except RelaySchedulerBusyError:
+            response = RelayResponse(status="busy", reply=BUSY_MESSAGE)
+
+    get_relay_stage_stats().record(timer)
+    logger.debug("relay_stages", guild_id=guild_id, status=response.status, **timer.as_dict())
+    yield response
+
+
+async def _relay_scheduled(
+    payload: RelayRequest, session: AsyncSession, redis: Redis, target: RelayTarget
+) -> AsyncIterator[str | RelayResponse]:
+    """Admission and the rest of the pipeline, inside a scheduler slot."""
+    guild_id = int(payload.guild_id)
+    channel_id = int(payload.channel_id)
+    # 2. All plan limits in one atomic Redis call (daily slot only if new).
+    # The monthly quota must fit at least the system prompt and this message.
+    ticket_id = target.ticket_id
+    with stage("admit"):
+        verdict = await admit_relay(
+            redis,
+            guild_id,
+            target.plan,
+            ticket_id is None,
+            tokens=min_prompt_tokens(target.system_prompt or "", payload.content),
+        )
+    if not verdict.allowed:
+        yield RelayResponse(status="limit_exceeded", reply=verdict.message)
+        return
+
+    async with hold_lease(redis, guild_id, verdict.lease_id):
+        # 3. Create ticket if needed
+        has_history = ticket_id is not None
+        if ticket_id is None:
+            with stage("create_ticket"):
+                ticket_id, is_new = await create_ticket(session, guild_id, channel_id)
+            if not is_new:
+                # A concurrent first message created it; only that one counts
+                await release_daily_ticket(redis, guild_id)
+                has_history = True
+
+        # 4. Store user message, retrieve knowledge and load history, all on
+        # the relay's one connection: extra sessions per relay can exhaust the
+        # pool with every relay holding one and waiting for another. History
+        # is read without this request's message, which is appended here
+        # instead.
+        message_id = uuid.uuid4()
+        with stage("context"):
+            await _store_message(session, redis, ticket_id, payload.content, message_id)
+            knowledge_items = await _search_knowledge(session, guild_id, payload.content, redis)
+            last_msgs = (
+                await _load_history(
+                    session, ticket_id, config.prompt_max_messages - 1, redis, message_id
+                )
+                if has_history
+                else []
+            )
+
+        # 5. Build prompt context, no larger than what is left of the quota
+        knowledge_chunks = [
+            {"title": k.title, "content": k.content} for k in knowledge_items
+        ]
+        message_history = [
+            {"role": m.role, "content": m.content} for m in last_msgs
+        ]
+        message_history.append({"role": "user", "content": payload.content})
+        with stage("prompt"):
+            prompt_context = build_prompt_context(
+                target.system_prompt or "",
+                knowledge_chunks,
+                message_history,
+                budget=min(config.prompt_token_budget, verdict.monthly_tokens_left),
+            )
+
+        # 6. Generate the reply, streaming pieces to the caller
+        pieces: list[str] = []
+        with stage("generate"):
+            async for piece in generate_reply(prompt_context):
+                if not pieces:
+                    mark("first_token")
+                pieces.append(piece)
+                yield piece
+        reply = "".join(pieces)
+        await store_message(session, redis, ticket_id, "assistant", reply)
+
+    yield RelayResponse(
+        status="ok",
+        reply=reply,
+        prompt_context=prompt_context,
+    )
+
+
+async def relay_message_stream(
+    payload: RelayRequest, session: AsyncSession, redis: Redis
+) -> AsyncIterator[str | RelayResponse]:
+    """
+    Relay one message, at most once per (guild, Discord message id).
+
+    Yields reply text pieces as they are generated, then the RelayResponse.
+    Requests carrying a ``message_id`` are idempotent for
+    RELAY_IDEMPOTENCY_TTL_S: a retry waits for the original attempt if it is
+    still running and gets the same response (without pieces) instead of
+    relaying again (IdempotencyTimeoutError if it waits too long). The
+    session is committed before the response is yielded or published.
+    """
+    claim = None
+    if payload.message_id:
+        guild_id = int(payload.guild_id)
+        claim = await claim_idempotency(redis, relay_idempotency_key(guild_id, payload.message_id))
+        if claim.cached is not None:
+            logger.info("relay_duplicate", guild_id=guild_id, message_id=payload.message_id)
+            yield RelayResponse.model_validate_json(claim.cached)
+            return
+    try:
+        async with aclosing(_relay(payload, session, redis)) as stream:
+            async for item in stream:
+                if not isinstance(item, RelayResponse):
+                    yield item
+                    continue
+                response = item
+        await session.commit()
+        if claim is not None:
+            if response.status == "busy":
+                # Nothing was done; a retry should get a fresh chance
+                await claim.release()
+            else:
+                await claim.complete(response.model_dump_json())
+    except BaseException:
+        # Let the client's retry run the relay again
+        if claim is not None:
+            await claim.release()
+        raise
+    yield response
+
+
+async def relay_message(
+    payload: RelayRequest, session: AsyncSession, redis: Redis
+) -> RelayResponse:
+    """Relay one message and return the complete response (see relay_message_stream)."""
+    async with aclosing(relay_message_stream(payload, session, redis)) as stream:
+        async for item in stream:
+            if isinstance(item, RelayResponse):
+                return item
+    raise RuntimeError("Relay pipeline produced no response")
@@ -0,0 +1,23 @@
+"""Reply generation - streams reply text for a prompt context."""
+
+import asyncio
+from collections.abc import AsyncIterator
+
+from backend.config import config
+from backend.schemas.relay import PromptContext
+
+PLACEHOLDER_REPLY = "AI is thinking... (Phase 2 placeholder)"
+
+
+async def generate_reply(prompt_context: PromptContext) -> AsyncIterator[str]:
+    """
+    Yield reply text pieces as the model produces them.
+
+    Phase 2: a local fake model that streams the placeholder reply word by
+    word, FAKE_MODEL_TOKEN_DELAY_MS apart. Phase 3 swaps in the AI call.
+    """
+    delay = config.fake_model_token_delay_ms / 1000
+    for i, word in enumerate(PLACEHOLDER_REPLY.split(" ")):
+        if delay > 0:
+            await asyncio.sleep(delay)
+        yield word if i == 0 else f" {word}"
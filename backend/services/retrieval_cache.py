@@ -0,0 +1,102 @@
+"""Retrieval result cache - ranked passage ids keyed by guild knowledge version."""
+
+import hashlib
+import uuid
+from collections import OrderedDict
+
+import structlog
+from redis.asyncio import Redis
+
+from backend.config import config
+from backend.services.embedding_cache import normalize_query
+
+logger = structlog.get_logger(__name__)
+
+
+def retrieval_cache_key(guild_id: int, version: int, query: str, top_k: int) -> str:
+    """
+    Key for one search. It embeds the guild's knowledge version, so any
+    knowledge write (which bumps it) makes older entries unreachable.
+    """
+    # Retrieval settings change the ranking, so they are part of the key
+    settings = f"{config.embedding_model}\n{config.knowledge_retrieval}\n{config.knowledge_search_mode}"
+    digest = hashlib.sha256(f"{settings}\n{normalize_query(query)}".encode()).hexdigest()
+    return f"g:{guild_id}:kr:{version}:{top_k}:{digest}"
+
+
+class RetrievalCache:
+    """
+    Two-tier cache of search_knowledge rankings (passage ids, best first).
+
+    Same layout as the query embedding cache: a bounded per-process LRU in
+    front of Redis (shared by replicas, ``ttl`` seconds). No explicit
+    invalidation is needed; Redis failures count as misses.
+    """
+
+    def __init__(self, max_entries: int = 4096, ttl: int = 3600) -> None:
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self._lru: OrderedDict[str, list[uuid.UUID]] = OrderedDict()
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    def _remember(self, key: str, chunk_ids: list[uuid.UUID]) -> None:
+        self._lru[key] = chunk_ids
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    async def get(self, redis: Redis, key: str) -> list[uuid.UUID] | None:
+        """Return cached passage ids, or None on a miss."""
+        chunk_ids = self._lru.get(key)
+        if chunk_ids is not None:
+            self._lru.move_to_end(key)
+            self.local_hits += 1
+            return chunk_ids
+        try:
+            value = await redis.get(key)
+        except Exception as e:
+            logger.warning("retrieval_cache_redis_get_failed", error=str(e))
+            value = None
+        if value is not None:
+            chunk_ids = [uuid.UUID(v) for v in value.split(",") if v]
+            self._remember(key, chunk_ids)
+            self.redis_hits += 1
+            return chunk_ids
+        self.misses += 1
+        return None
+
+    async def set(self, redis: Redis, key: str, chunk_ids: list[uuid.UUID]) -> None:
+        """Store a ranking in both tiers (empty rankings are cached too)."""
+        self._remember(key, chunk_ids)
+        try:
+            await redis.set(key, ",".join(str(c) for c in chunk_ids), ex=self.ttl)
+        except Exception as e:
+            logger.warning("retrieval_cache_redis_set_failed", error=str(e))
+
+    def stats(self) -> dict[str, int | float]:
+        """Hit/miss counters for the metrics endpoint."""
+        lookups = self.local_hits + self.redis_hits + self.misses
+        return {
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_rate": (self.local_hits + self.redis_hits) / lookups if lookups else 0.0,
+            "local_size": len(self._lru),
+        }
+
+
+# Global cache instance
+_cache: RetrievalCache | None = None
+
+
+def get_retrieval_cache() -> RetrievalCache:
+    """Get or create the global retrieval result cache."""
+    global _cache
+    if _cache is None:
+        _cache = RetrievalCache(
+            max_entries=config.retrieval_cache_size,
+            ttl=config.retrieval_cache_ttl,
+        )
+    return _cache
@@ -1,50 +1,134 @@
 """Ticket service - get or create ticket."""
 
 import uuid
-from sqlalchemy import select
+from dataclasses import dataclass
+
+from sqlalchemy import and_, exists, select, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from backend.models.guild import Guild
 from backend.models.ticket import Ticket
+from backend.schemas.plans import DEFAULT_SYSTEM_PROMPT
+from backend.services.guild_cache import GuildSettings, get_guild_cache
+
+
+@dataclass(frozen=True)
+class RelayTarget:
+    """Guild settings and open ticket (if any) for a relayed message."""
+
+    guild_id: int
+    plan: str
+    system_prompt: str
+    ticket_id: uuid.UUID | None
 
 
-async def get_ticket(
+async def resolve_relay_target(
     session: AsyncSession,
     guild_id: int,
     channel_id: int,
-) -> Ticket | None:
-    """Get existing open ticket by guild and channel."""
+) -> RelayTarget:
+    """
+    Upsert the guild and look up the channel's open ticket in one statement.
+
+    INSERT ... ON CONFLICT DO NOTHING creates unknown guilds; the existing
+    row is read in the same CTE otherwise, and the open ticket is joined on.
+    When the guild's settings are cached, only the ticket is looked up.
+    ``ticket_id`` is None when the message would open a new ticket.
+    """
+    cache = get_guild_cache()
+    settings = cache.get(guild_id)
+    if settings is not None:
+        result = await session.execute(
+            select(Ticket.id).where(
+                Ticket.guild_id == guild_id,
+                Ticket.channel_id == channel_id,
+                Ticket.status == "open",
+            )
+        )
+        return RelayTarget(
+            guild_id=guild_id,
+            plan=settings.plan,
+            system_prompt=settings.system_prompt,
+            ticket_id=result.scalar_one_or_none(),
+        )
+
+    token = cache.begin_load()
+    inserted = (
+        pg_insert(Guild)
+        .values(id=guild_id, name="", plan="free", system_prompt=DEFAULT_SYSTEM_PROMPT)
+        .on_conflict_do_nothing(index_elements=[Guild.id])
+        .returning(Guild.id, Guild.plan, Guild.system_prompt)
+        .cte("inserted")
+    )
+    guild = union_all(
+        select(inserted.c.id, inserted.c.plan, inserted.c.system_prompt),
+        select(Guild.id, Guild.plan, Guild.system_prompt).where(
+            Guild.id == guild_id, ~exists(select(inserted.c.id))
+        ),
+    ).cte("guild")
     result = await session.execute(
-        select(Ticket).where(
-            Ticket.guild_id == guild_id,
-            Ticket.channel_id == channel_id,
-            Ticket.status == "open",
+        select(guild.c.plan, guild.c.system_prompt, Ticket.id.label("ticket_id")).select_from(
+            guild.outerjoin(
+                Ticket,
+                and_(
+                    Ticket.guild_id == guild.c.id,
+                    Ticket.channel_id == channel_id,
+                    Ticket.status == "open",
+                ),
+            )
         )
     )
-    return result.scalar_one_or_none()
+    row = result.first()
+    if row is None:
+        # A concurrent transaction inserted the guild after this statement's
+        # snapshot was taken; a fresh statement sees it
+        result = await session.execute(
+            select(Guild.plan, Guild.system_prompt, Ticket.id.label("ticket_id"))
+            .outerjoin(
+                Ticket,
+                and_(
+                    Ticket.guild_id == Guild.id,
+                    Ticket.channel_id == channel_id,
+                    Ticket.status == "open",
+                ),
+            )
+            .where(Guild.id == guild_id)
+        )
+        row = result.one()
+    cache.set(guild_id, GuildSettings(plan=row.plan, system_prompt=row.system_prompt), token)
+    return RelayTarget(
+        guild_id=guild_id,
+        plan=row.plan,
+        system_prompt=row.system_prompt,
+        ticket_id=row.ticket_id,
+    )
 
 
-async def get_or_create_ticket(
+async def create_ticket(
     session: AsyncSession,
     guild_id: int,
     channel_id: int,
-) -> tuple[Ticket, bool]:
+) -> tuple[uuid.UUID, bool]:
     """
-    Get existing ticket or create new one.
-    Returns (ticket, is_new). Caller must check daily limit BEFORE calling
-    when ticket doesn't exist - this will create and consume a daily slot.
-    """
-    ticket = await get_ticket(session, guild_id, channel_id)
-    if ticket:
-        return ticket, False
+    Insert the channel's ticket unless it already exists.
 
-    ticket = Ticket(
-        guild_id=guild_id,
-        channel_id=channel_id,
-        status="open",
+    Returns (ticket_id, is_new). is_new is False when a concurrent request
+    created it first (ON CONFLICT DO NOTHING), so only one daily slot is used.
+    """
+    result = await session.execute(
+        pg_insert(Ticket)
+        .values(id=uuid.uuid4(), guild_id=guild_id, channel_id=channel_id, status="open")
+        .on_conflict_do_nothing(index_elements=[Ticket.guild_id, Ticket.channel_id])
+        .returning(Ticket.id)
+    )
+    ticket_id = result.scalar_one_or_none()
+    if ticket_id is not None:
+        return ticket_id, True
+    result = await session.execute(
+        select(Ticket.id).where(Ticket.guild_id == guild_id, Ticket.channel_id == channel_id)
     )
-    session.add(ticket)
-    await session.flush()
-    return ticket, True
+    return result.scalar_one(), False
 
 
 async def get_ticket_by_channel(
@@ -0,0 +1,151 @@
+"""Per-guild in-memory vector index with cross-replica invalidation."""
+
+import uuid
+from collections import OrderedDict
+from typing import NamedTuple
+
+import structlog
+from redis.asyncio import Redis
+from sqlalchemy import case, select, type_coerce
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.config import config
+from backend.models.knowledge_chunk import KnowledgeChunk
+from backend.utils.vector_search import EmbeddingMatrix
+
+logger = structlog.get_logger(__name__)
+
+
+def _redis_key_knowledge_version(guild_id: int) -> str:
+    return f"g:{guild_id}:knowledge_version"
+
+
+async def get_knowledge_version(redis: Redis, guild_id: int) -> int:
+    """Current knowledge version for guild (0 if never written)."""
+    return int(await redis.get(_redis_key_knowledge_version(guild_id)) or 0)
+
+
+async def bump_knowledge_version(redis: Redis, guild_id: int) -> int:
+    """
+    Mark a guild's knowledge as changed. Call after the write is committed.
+
+    Every replica compares this counter on lookup, so bumping it invalidates
+    their cached index for the guild.
+    """
+    get_vector_index().invalidate(guild_id)
+    return int(await redis.incr(_redis_key_knowledge_version(guild_id)))
+
+
+class GuildVectors(NamedTuple):
+    """A guild's embedded passages plus those still waiting for an embedding."""
+
+    matrix: EmbeddingMatrix[uuid.UUID]
+    pending: frozenset[uuid.UUID]
+
+
+class GuildVectorIndex:
+    """
+    LRU of per-guild EmbeddingMatrix objects over knowledge passages.
+
+    Indexes are built lazily from the DB (chunk ids and embeddings only) and
+    tagged with the guild's knowledge version from Redis; a lookup whose
+    version no longer matches rebuilds. Least recently used guilds are
+    evicted once the matrices exceed ``max_bytes``.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[int, tuple[int, GuildVectors]] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.builds = 0
+        self.evictions = 0
+
+    async def get(
+        self,
+        session: AsyncSession,
+        redis: Redis | None,
+        guild_id: int,
+        version: int | None = None,
+    ) -> GuildVectors:
+        """
+        Return the guild's index, rebuilding it if stale or missing.
+
+        Pass ``version`` if the caller already read it from Redis.
+        """
+        if version is None and redis is not None:
+            try:
+                version = await get_knowledge_version(redis, guild_id)
+            except Exception as e:
+                logger.warning("vector_index_version_failed", guild_id=guild_id, error=str(e))
+
+        entry = self._entries.get(guild_id)
+        if entry is not None and version is not None and entry[0] == version:
+            self._entries.move_to_end(guild_id)
+            self.hits += 1
+            return entry[1]
+
+        vectors = await self._build(session, guild_id)
+        self.builds += 1
+        # Without a version we can't tell when it goes stale, so don't keep it
+        if version is not None:
+            self._store(guild_id, version, vectors)
+        return vectors
+
+    async def _build(self, session: AsyncSession, guild_id: int) -> GuildVectors:
+        # Vectors from another model (mid re-embed) count as pending; don't load them
+        active_embedding = type_coerce(
+            case(
+                (KnowledgeChunk.embedding_model == config.embedding_model, KnowledgeChunk.embedding),
+                else_=None,
+            ),
+            KnowledgeChunk.embedding.type,
+        ).label("embedding")
+        result = await session.execute(
+            select(KnowledgeChunk.id, active_embedding).where(KnowledgeChunk.guild_id == guild_id)
+        )
+        rows = result.all()
+        ready = [row for row in rows if row.embedding is not None]
+        return GuildVectors(
+            matrix=EmbeddingMatrix.from_vectors(
+                [row.id for row in ready], [row.embedding for row in ready]
+            ),
+            pending=frozenset(row.id for row in rows if row.embedding is None),
+        )
+
+    def _store(self, guild_id: int, version: int, vectors: GuildVectors) -> None:
+        self.invalidate(guild_id)
+        self._entries[guild_id] = (version, vectors)
+        self._bytes += vectors.matrix.nbytes
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._bytes -= evicted.matrix.nbytes
+            self.evictions += 1
+
+    def invalidate(self, guild_id: int) -> None:
+        """Drop this process's cached index for a guild."""
+        entry = self._entries.pop(guild_id, None)
+        if entry is not None:
+            self._bytes -= entry[1].matrix.nbytes
+
+    def stats(self) -> dict[str, int]:
+        """Counters for the metrics endpoint."""
+        return {
+            "hits": self.hits,
+            "builds": self.builds,
+            "evictions": self.evictions,
+            "guilds": len(self._entries),
+            "bytes": self._bytes,
+        }
+
+
+# Global index instance
+_index: GuildVectorIndex | None = None
+
+
+def get_vector_index() -> GuildVectorIndex:
+    """Get or create the global per-guild vector index."""
+    global _index
+    if _index is None:
+        _index = GuildVectorIndex(max_bytes=config.vector_index_max_mb * 1024 * 1024)
+    return _index
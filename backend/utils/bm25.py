@@ -0,0 +1,83 @@
+"""BM25 inverted index and rank fusion for lexical retrieval."""
+
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from collections.abc import Hashable, Sequence
+from typing import Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+
+# Words, plus identifiers such as error codes, versions and command names
+# ("e-1042", "v2.3.1", "reset_password") kept as single tokens
+_TOKEN_RE = re.compile(r"\w+(?:[-_.:/]\w+)*")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase text and split it into BM25 terms."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def is_identifier(token: str) -> bool:
+    """Whether a token looks like a code/command rather than a plain word."""
+    return any(c.isdigit() for c in token) or any(c in "-_.:/" for c in token)
+
+
+class BM25Index(Generic[K]):
+    """Okapi BM25 over a fixed set of documents (rebuilt when they change)."""
+
+    def __init__(
+        self, ids: Sequence[K], texts: Sequence[str], k1: float = 1.2, b: float = 0.75
+    ) -> None:
+        self.ids: list[K] = list(ids)
+        self.k1 = k1
+        self.b = b
+        self._postings: dict[str, list[tuple[int, int]]] = defaultdict(list)
+        self._doc_len: list[int] = []
+        for i, text in enumerate(texts):
+            tokens = tokenize(text)
+            self._doc_len.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                self._postings[term].append((i, tf))
+        self._avgdl = (sum(self._doc_len) / len(self._doc_len)) if self._doc_len else 1.0
+        n = len(self.ids)
+        self._idf = {
+            term: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5))
+            for term, p in self._postings.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, query: str, k: int) -> list[tuple[K, float]]:
+        """Return up to k (id, BM25 score) pairs with a non-zero score."""
+        scores: dict[int, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf[term]
+            for i, tf in postings:
+                norm = 1 - self.b + self.b * self._doc_len[i] / self._avgdl
+                scores[i] += idf * tf * (self.k1 + 1) / (tf + self.k1 * norm)
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(self.ids[i], score) for i, score in best]
+
+    def matched_identifiers(self, query: str, doc_id: K) -> list[str]:
+        """Identifier-like query terms that occur in the given document."""
+        i = self.ids.index(doc_id)
+        return [
+            term
+            for term in set(tokenize(query))
+            if is_identifier(term) and any(d == i for d, _ in self._postings.get(term, ()))
+        ]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[K]], k: int = 60) -> list[K]:
+    """Merge ranked id lists by summing 1 / (k + rank); best first."""
+    scores: dict[K, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] += 1.0 / (k + rank + 1)
+    return sorted(scores, key=lambda doc_id: scores[doc_id], reverse=True)
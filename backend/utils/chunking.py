@@ -0,0 +1,22 @@
+"""Split knowledge content into overlapping passages for embedding."""
+
+
+def split_passages(text: str, max_words: int = 120, overlap: int = 30) -> list[str]:
+    """
+    Split text into passages of at most ``max_words`` words.
+
+    Consecutive passages share ``overlap`` words so a sentence cut at a
+    boundary still appears whole in one of them. Short texts return a
+    single passage; whitespace inside a passage is collapsed.
+    """
+    words = text.split()
+    if not words:
+        return []
+    max_words = max(1, max_words)
+    step = max(1, max_words - max(0, overlap))
+    passages = []
+    for start in range(0, len(words), step):
+        passages.append(" ".join(words[start : start + max_words]))
+        if start + max_words >= len(words):
+            break
+    return passages
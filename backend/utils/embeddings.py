@@ -1,11 +1,17 @@
 """Embeddings utility using sentence-transformers."""
 
+import hashlib
 from typing import TYPE_CHECKING
 
+from backend.config import config
+
 if TYPE_CHECKING:
     from sentence_transformers import SentenceTransformer
 
 _model: "SentenceTransformer | None" = None
+# Active model (EMBEDDING_MODEL); recorded on every stored vector
+EMBEDDING_MODEL_NAME = config.embedding_model
+# Dimensions of the default all-MiniLM-L6-v2 (and the pgvector column)
 EMBEDDING_DIM = 384
 
 
@@ -14,7 +20,7 @@ def get_embedding_model() -> "SentenceTransformer":
     global _model
     if _model is None:
         from sentence_transformers import SentenceTransformer
-        _model = SentenceTransformer("all-MiniLM-L6-v2")
+        _model = SentenceTransformer(EMBEDDING_MODEL_NAME)
     return _model
 
 
@@ -25,6 +31,20 @@ def embed_text(text: str) -> list[float]:
     return embedding.tolist()
 
 
+def embed_texts(texts: list[str]) -> list[list[float]]:
+    """Get embedding vectors for several texts in one forward pass."""
+    if not texts:
+        return []
+    model = get_embedding_model()
+    embeddings = model.encode(texts, batch_size=len(texts), convert_to_numpy=True)
+    return embeddings.tolist()
+
+
+def content_hash(text: str) -> str:
+    """Hash of the exact embedded text and model; equal hashes share a vector."""
+    return hashlib.sha256(f"{EMBEDDING_MODEL_NAME}\n{text}".encode("utf-8")).hexdigest()
+
+
 def cosine_similarity(a: list[float], b: list[float]) -> float:
     """Compute cosine similarity between two vectors."""
     import numpy as np
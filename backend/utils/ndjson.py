@@ -0,0 +1,17 @@
+"""Incremental line splitting for streamed NDJSON bodies."""
+
+from collections.abc import AsyncIterable, AsyncIterator
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    """Yield decoded lines from a byte stream without buffering the whole body."""
+    buffer = bytearray()
+    async for chunk in chunks:
+        buffer.extend(chunk)
+        start = 0
+        while (end := buffer.find(b"\n", start)) != -1:
+            yield buffer[start:end].decode("utf-8", errors="replace")
+            start = end + 1
+        del buffer[:start]
+    if buffer:
+        yield buffer.decode("utf-8", errors="replace")
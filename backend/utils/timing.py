@@ -0,0 +1,113 @@
+"""Per-stage latency timing for request pipelines."""
+
+import time
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+class StageTimer:
+    """Wall-clock milliseconds per named stage of one request."""
+
+    def __init__(self) -> None:
+        self.stages: dict[str, float] = {}
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    def mark(self, name: str) -> None:
+        """Record the time from the start of the request to now."""
+        self.stages[name] = self.total_ms()
+
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self._started) * 1000
+
+    def as_dict(self) -> dict[str, float]:
+        """Stage timings rounded for logging, plus the request total."""
+        timings = {name: round(ms, 2) for name, ms in self.stages.items()}
+        timings["total"] = round(self.total_ms(), 2)
+        return timings
+
+
+# Timer of the request being handled; tasks spawned by it share the object
+_current: ContextVar[StageTimer | None] = ContextVar("stage_timer", default=None)
+
+
+@contextmanager
+def track_stages() -> Iterator[StageTimer]:
+    """
+    Collect stage() timings from this context (and tasks it starts).
+
+    Restores the previous timer by value rather than ContextVar.reset, so it
+    is safe inside async generators finalized from another context.
+    """
+    timer = StageTimer()
+    previous = _current.get()
+    _current.set(timer)
+    try:
+        yield timer
+    finally:
+        _current.set(previous)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a block under the current request's timer; no-op outside one."""
+    timer = _current.get()
+    if timer is None:
+        yield
+        return
+    with timer.stage(name):
+        yield
+
+
+def mark(name: str) -> None:
+    """Record a point in time (e.g. first token) under the current timer."""
+    timer = _current.get()
+    if timer is not None:
+        timer.mark(name)
+
+
+class StageStats:
+    """Rolling per-stage latency summary over the last ``window`` requests."""
+
+    def __init__(self, window: int = 512) -> None:
+        self.window = max(1, window)
+        self.requests = 0
+        self._samples: dict[str, deque[float]] = {}
+
+    def record(self, timer: StageTimer) -> None:
+        self.requests += 1
+        for name, ms in timer.as_dict().items():
+            self._samples.setdefault(name, deque(maxlen=self.window)).append(ms)
+
+    def stats(self) -> dict[str, object]:
+        """Mean and p95 milliseconds per stage for the metrics endpoint."""
+        stages = {}
+        for name, samples in self._samples.items():
+            ordered = sorted(samples)
+            stages[name] = {
+                "mean_ms": round(sum(ordered) / len(ordered), 2),
+                "p95_ms": ordered[int(0.95 * (len(ordered) - 1))],
+            }
+        return {"requests": self.requests, "stages": stages}
+
+
+# Global relay stage stats
+_relay_stats: StageStats | None = None
+
+
+def get_relay_stage_stats() -> StageStats:
+    """Get or create the relay pipeline's stage stats."""
+    global _relay_stats
+    if _relay_stats is None:
+        _relay_stats = StageStats()
+    return _relay_stats
@@ -0,0 +1,94 @@
+"""Token counting and truncation with a cached local tokenizer."""
+
+import hashlib
+import math
+from collections import OrderedDict
+from functools import lru_cache
+
+import structlog
+
+from backend.config import config
+
+logger = structlog.get_logger(__name__)
+
+TRUNCATION_MARKER = "\n[... truncated ...]\n"
+
+_counts: OrderedDict[str, int] = OrderedDict()
+_COUNT_CACHE_SIZE = 8192
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """
+    Load the tiktoken encoding once; None if it can't be loaded.
+
+    Covers tiktoken not being installed and the encoding file failing to
+    download (no network on first use), so counting falls back to the
+    estimate instead of failing every relay.
+    """
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(config.prompt_tokenizer)
+    except Exception as e:
+        logger.warning("tiktoken_unavailable", fallback="estimate", error=str(e))
+        return None
+
+
+def _estimate(text: str) -> int:
+    # Roughly 4 characters per token for English BPE vocabularies
+    return math.ceil(len(text) / 4)
+
+
+def count_tokens(text: str) -> int:
+    """
+    Number of tokens in text.
+
+    Counts of recently seen texts (system prompts, knowledge passages,
+    history) are cached by content hash.
+    """
+    if not text:
+        return 0
+    key = hashlib.sha1(text.encode()).hexdigest()
+    count = _counts.get(key)
+    if count is not None:
+        _counts.move_to_end(key)
+        return count
+    encoding = _get_encoding()
+    count = len(encoding.encode(text, disallowed_special=())) if encoding else _estimate(text)
+    _counts[key] = count
+    while len(_counts) > _COUNT_CACHE_SIZE:
+        _counts.popitem(last=False)
+    return count
+
+
+def truncate_tokens(text: str, max_tokens: int, keep_tail: bool = False) -> str:
+    """
+    Shorten text to at most ``max_tokens`` tokens.
+
+    With ``keep_tail``, the middle is cut instead of the end, so both the
+    start and the end of a pasted log survive.
+    """
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    budget = max(0, max_tokens - count_tokens(TRUNCATION_MARKER))
+    encoding = _get_encoding()
+    if encoding is None:
+        # Character cut sized by the estimate
+        chars = budget * 4
+        if keep_tail:
+            head = chars // 2
+            return text[:head] + TRUNCATION_MARKER + text[len(text) - (chars - head):]
+        return text[:chars] + TRUNCATION_MARKER.rstrip()
+    tokens = encoding.encode(text, disallowed_special=())
+    if keep_tail:
+        head = budget // 2
+        tail = budget - head
+        return (
+            encoding.decode(tokens[:head])
+            + TRUNCATION_MARKER
+            + encoding.decode(tokens[len(tokens) - tail:] if tail else [])
+        )
+    return encoding.decode(tokens[:budget]) + TRUNCATION_MARKER.rstrip()
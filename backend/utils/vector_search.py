@@ -0,0 +1,74 @@
+"""Vectorized top-k scoring over pre-normalized embedding matrices."""
+
+from collections.abc import Hashable, Sequence
+from typing import Generic, TypeVar
+
+import numpy as np
+
+K = TypeVar("K", bound=Hashable)
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize vectors along the last axis as float32."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-9)
+
+
+def _top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k highest scores per row, best first (partial selection)."""
+    n = scores.shape[-1]
+    if k >= n:
+        idx = np.broadcast_to(np.arange(n), scores.shape).copy()
+    else:
+        idx = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+    order = np.argsort(-np.take_along_axis(scores, idx, axis=-1), axis=-1, kind="stable")
+    return np.take_along_axis(idx, order, axis=-1)
+
+
+class EmbeddingMatrix(Generic[K]):
+    """
+    Embeddings for a set of ids stacked into one normalized float32 matrix.
+
+    Rows are normalized once at build time, so cosine similarity for a query
+    is a single matrix-vector product against the unit query vector.
+    """
+
+    def __init__(self, ids: Sequence[K], matrix: np.ndarray) -> None:
+        self.ids: list[K] = list(ids)
+        self.matrix = matrix
+
+    @classmethod
+    def from_vectors(
+        cls, ids: Sequence[K], vectors: Sequence[Sequence[float]] | np.ndarray
+    ) -> "EmbeddingMatrix[K]":
+        """Stack and normalize raw vectors (one per id)."""
+        if len(ids) == 0:
+            return cls([], np.empty((0, 0), dtype=np.float32))
+        return cls(ids, normalize_rows(np.asarray(vectors, dtype=np.float32)))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the matrix."""
+        return int(self.matrix.nbytes)
+
+    def top_k(self, query: Sequence[float] | np.ndarray, k: int) -> list[tuple[K, float]]:
+        """Return up to k (id, cosine similarity) pairs, best first."""
+        return self.top_k_batch(np.asarray(query, dtype=np.float32)[None, :], k)[0]
+
+    def top_k_batch(
+        self, queries: Sequence[Sequence[float]] | np.ndarray, k: int
+    ) -> list[list[tuple[K, float]]]:
+        """Score a batch of queries with one matrix product; top k per query."""
+        q = normalize_rows(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+        if not self.ids or k <= 0:
+            return [[] for _ in range(q.shape[0])]
+        scores = q @ self.matrix.T
+        best = _top_k_indices(scores, k)
+        return [
+            [(self.ids[i], float(row_scores[i])) for i in row_idx]
+            for row_idx, row_scores in zip(best, scores)
+        ]
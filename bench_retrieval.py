@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Benchmark pure-vector vs hybrid (BM25 + vector) knowledge retrieval.
+
+Runs in memory against a synthetic corpus (no DB/Redis) using the real
+embedding model, mirroring the ranking logic of search_knowledge:
+
+    python bench_retrieval.py [--codes 200] [--top-k 3]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+project_root = Path(__file__).parent.absolute()
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from backend.config import config
+from backend.services.lexical_index import GuildLexicalIndex
+from backend.utils.bm25 import BM25Index, reciprocal_rank_fusion
+from backend.utils.embeddings import embed_text, embed_texts
+from backend.utils.vector_search import EmbeddingMatrix
+
+# (passage, paraphrased question that should retrieve it)
+FAQ = [
+    ("Password reset: open Settings > Account and click 'Forgot password' to get a reset email.",
+     "how can I change my password if I forgot it"),
+    ("Refunds are processed within 5 business days after the request is approved by billing.",
+     "how long until I get my money back"),
+    ("Our support team is available Monday to Friday, 9am to 5pm UTC.",
+     "what hours can I reach a human"),
+    ("To upgrade your plan, go to the dashboard, open Billing and choose Pro or Business.",
+     "I want a bigger subscription tier"),
+    ("Two-factor authentication can be enabled under Security using any TOTP authenticator app.",
+     "how do I turn on 2FA for extra security"),
+    ("Exports are generated as CSV files and emailed to the workspace owner within an hour.",
+     "can I download my data as a spreadsheet"),
+    ("Deleting your account removes all data permanently after a 30 day grace period.",
+     "how to close my account for good"),
+    ("The bot needs Manage Channels and Send Messages permissions to create ticket channels.",
+     "why can't the bot make new channels"),
+    ("Invoices are available under Billing > History and can be downloaded as PDF.",
+     "where do I find my receipts"),
+    ("Webhooks retry failed deliveries up to five times with exponential backoff.",
+     "what happens when my endpoint is down and a notification fails"),
+    ("You can invite teammates from Settings > Members; each seat is billed monthly.",
+     "how do I add coworkers to my workspace"),
+    ("API rate limits are 100 requests per minute per token; exceeding them returns HTTP 429.",
+     "why am I getting too many requests responses"),
+]
+
+CODE_TEMPLATE = "Error E-{code}: the {component} service rejected the request. {fix}"
+COMPONENTS = ["sync", "upload", "login", "payment", "export", "webhook", "search", "import"]
+FIXES = [
+    "Clear the cache and retry.",
+    "Re-authenticate and try again.",
+    "Check that the file is under 25 MB.",
+    "Contact support with the request id.",
+]
+
+
+def build_corpus(n_codes: int) -> tuple[list[str], list[tuple[str, int]]]:
+    """Return passages and (query, index of the relevant passage) pairs."""
+    passages = [p for p, _ in FAQ]
+    queries = [(q, i) for i, (_, q) in enumerate(FAQ)]
+    for i in range(n_codes):
+        code = 1000 + i
+        passages.append(
+            CODE_TEMPLATE.format(
+                code=code,
+                component=COMPONENTS[i % len(COMPONENTS)],
+                fix=FIXES[i % len(FIXES)],
+            )
+        )
+        queries.append((f"I keep getting E-{code} when I try this, what should I do?", len(passages) - 1))
+    return passages, queries
+
+
+def vector_search(matrix: EmbeddingMatrix[int], query: str, k: int) -> list[int]:
+    return [i for i, _ in matrix.top_k(embed_text(query), k)]
+
+
+def hybrid_search(
+    matrix: EmbeddingMatrix[int],
+    bm25: BM25Index[int],
+    lexical: GuildLexicalIndex,
+    query: str,
+    k: int,
+) -> list[int]:
+    hits = bm25.search(query, config.hybrid_candidates)
+    if lexical.is_decisive(bm25, query, hits):
+        return [i for i, _ in hits[:k]]
+    vector = vector_search(matrix, query, max(k, config.hybrid_candidates))
+    return reciprocal_rank_fusion([vector, [i for i, _ in hits]])[:k]
+
+
+def report(name: str, latencies: list[float], results: list[tuple[list[int], int]]) -> None:
+    hit1 = sum(1 for ranked, want in results if ranked[:1] == [want]) / len(results)
+    hitk = sum(1 for ranked, want in results if want in ranked) / len(results)
+    mrr = statistics.fmean(
+        1 / (ranked.index(want) + 1) if want in ranked else 0.0 for ranked, want in results
+    )
+    lat = sorted(latencies)
+    p95 = lat[int(0.95 * (len(lat) - 1))]
+    print(
+        f"{name:<8} mean {statistics.fmean(lat):7.2f} ms  p95 {p95:7.2f} ms  "
+        f"hit@1 {hit1:.3f}  hit@k {hitk:.3f}  MRR {mrr:.3f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--codes", type=int, default=200, help="error-code passages")
+    parser.add_argument("--top-k", type=int, default=3)
+    args = parser.parse_args()
+
+    passages, queries = build_corpus(args.codes)
+    print(f"Corpus: {len(passages)} passages, {len(queries)} queries, top_k={args.top_k}")
+    matrix = EmbeddingMatrix.from_vectors(list(range(len(passages))), embed_texts(passages))
+    bm25 = BM25Index(list(range(len(passages))), passages)
+    lexical = GuildLexicalIndex()
+    embed_text("warm up")
+
+    for name, search in (
+        ("vector", lambda q: vector_search(matrix, q, args.top_k)),
+        ("hybrid", lambda q: hybrid_search(matrix, bm25, lexical, q, args.top_k)),
+    ):
+        latencies, results = [], []
+        for query, want in queries:
+            start = time.perf_counter()
+            ranked = search(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+            results.append((ranked, want))
+        report(name, latencies, results)
+    print(f"hybrid short-circuits (query not embedded): {lexical.short_circuits}/{len(queries)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
 """Tickets cog for Discord bot."""
 
+import asyncio
 import logging
 import discord
 from discord import app_commands, ChannelType, PermissionOverwrite
 from discord.ext import commands
+from bot.config import config
 from bot.utils.http_client import get_client
 
 logger = logging.getLogger(__name__)
@@ -155,18 +157,21 @@ class TicketsCog(commands.Cog):
                 f"from user {message.author.id}"
             )
 
-            # Relay message to backend
-            response_data = await self.client.relay_message(
-                guild_id=str(message.guild.id),
-                channel_id=str(message.channel.id),
-                user_id=str(message.author.id),
-                content=message.content,
-                message_id=str(message.id),
-            )
+            if config.relay_streaming:
+                await self._relay_streaming(message)
+            else:
+                # Relay message to backend
+                response_data = await self.client.relay_message(
+                    guild_id=str(message.guild.id),
+                    channel_id=str(message.channel.id),
+                    user_id=str(message.author.id),
+                    content=message.content,
+                    message_id=str(message.id),
+                )
 
-            # Send response back to channel
-            reply_text = response_data.get("reply", "AI is thinking...")
-            await message.channel.send(reply_text)
+                # Send response back to channel
+                reply_text = response_data.get("reply", "AI is thinking...")
+                await message.channel.send(reply_text)
 
             logger.debug(
                 f"Successfully relayed and responded to message in "
@@ -188,6 +193,56 @@ class TicketsCog(commands.Cog):
                 # If we can't send error message, just log it
                 logger.error("Failed to send error message to channel")
 
+    async def _relay_streaming(self, message: discord.Message) -> None:
+        """
+        Relay a message and show the reply as it is generated.
+
+        The first text creates the reply message, which is then edited at
+        most every ``stream_edit_interval`` seconds and once more with the
+        final reply. If the stream fails before any text arrives, falls back
+        to the regular relay (with retries; the backend dedupes by message id).
+        """
+        loop = asyncio.get_running_loop()
+        reply_message: discord.Message | None = None
+        shown = ""
+        text = ""
+        last_edit = 0.0
+        try:
+            async for event, data in self.client.relay_message_stream(
+                guild_id=str(message.guild.id),
+                channel_id=str(message.channel.id),
+                user_id=str(message.author.id),
+                content=message.content,
+                message_id=str(message.id),
+            ):
+                if event == "token":
+                    text += data["text"]
+                    if reply_message is None:
+                        reply_message = await message.channel.send(text)
+                        shown, last_edit = text, loop.time()
+                    elif loop.time() - last_edit >= config.stream_edit_interval:
+                        await reply_message.edit(content=text)
+                        shown, last_edit = text, loop.time()
+                elif event == "done":
+                    text = data.get("reply") or text or "AI is thinking..."
+        except Exception as e:
+            if reply_message is not None:
+                raise
+            logger.warning(f"Streaming relay failed, falling back to regular relay: {e}")
+            response_data = await self.client.relay_message(
+                guild_id=str(message.guild.id),
+                channel_id=str(message.channel.id),
+                user_id=str(message.author.id),
+                content=message.content,
+                message_id=str(message.id),
+            )
+            text = response_data.get("reply", "AI is thinking...")
+
+        if reply_message is None:
+            await message.channel.send(text)
+        elif text != shown:
+            await reply_message.edit(content=text)
+
 
 async def setup(bot: commands.Bot) -> None:
     """Add the tickets cog to the bot."""
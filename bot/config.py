@@ -22,6 +22,13 @@ class BotConfig:
 
         self.log_level: str = os.getenv("LOG_LEVEL", "INFO").upper()
 
+        # Stream replies (POST /relay/stream), editing the reply message at
+        # most every stream_edit_interval seconds (Discord rate-limits edits).
+        # Turn off when the backend runs RELAY_MODE=async: the stream endpoint
+        # rejects it and each message would fall back to a queued job anyway
+        self.relay_streaming: bool = os.getenv("RELAY_STREAMING", "true").lower() == "true"
+        self.stream_edit_interval: float = float(os.getenv("STREAM_EDIT_INTERVAL_S", "1.0"))
+
     def validate(self) -> bool:
         """Validate that all required configuration is present."""
         return bool(self.discord_token and self.backend_url)
@@ -1,7 +1,9 @@
 """Async HTTP client for backend communication."""
 
 import asyncio
+import json
 import logging
+from collections.abc import AsyncIterator
 from typing import Any
 import aiohttp
 from bot.config import config
@@ -58,6 +60,9 @@ class BackendClient:
         Returns:
             Response dictionary containing 'reply' field
 
+        If the backend queues the message (202, RELAY_MODE=async), the job
+        result is long-polled until it is ready.
+
         Raises:
             Exception: If all retry attempts fail
         """
@@ -86,6 +91,10 @@ class BackendClient:
                         data = await response.json()
                         logger.debug("Successfully received response from backend")
                         return data
+                    if response.status == 202:
+                        job = await response.json()
+                        logger.debug(f"Relay queued as job {job['job_id']}")
+                        return await self.wait_for_relay_job(job["job_id"])
                     else:
                         error_text = await response.text()
                         raise Exception(
@@ -109,6 +118,104 @@ class BackendClient:
             raise Exception(f"Failed to relay message after {max_retries + 1} attempts") from last_error
         raise Exception("Failed to relay message: unknown error")
 
+    async def relay_message_stream(
+        self,
+        guild_id: str,
+        channel_id: str,
+        user_id: str,
+        content: str,
+        message_id: str | None = None,
+        idle_timeout: float = 30,
+    ) -> AsyncIterator[tuple[str, dict[str, Any]]]:
+        """
+        Relay a message and stream the reply as it is generated.
+
+        Args:
+            guild_id: Discord guild ID
+            channel_id: Discord channel ID
+            user_id: Discord user ID
+            content: Message content
+            message_id: Optional message ID
+            idle_timeout: Seconds to wait for the next event
+
+        Yields:
+            (event, data) pairs: ("token", {"text": ...}) while the reply is
+            generated, then ("done", response dictionary)
+
+        Raises:
+            Exception: On HTTP errors, an "error" event or a stream that ends
+                without a response (no retries; see relay_message)
+        """
+        url = f"{self.base_url}/relay/stream"
+        payload = {
+            "guild_id": str(guild_id),
+            "channel_id": str(channel_id),
+            "user_id": str(user_id),
+            "content": content,
+        }
+        if message_id:
+            payload["message_id"] = str(message_id)
+
+        session = await self._get_session()
+        # The whole reply may take longer than the normal request timeout
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=idle_timeout)
+        async with session.post(url, json=payload, timeout=timeout) as response:
+            if response.status != 200:
+                error_text = await response.text()
+                raise Exception(f"Backend returned status {response.status}: {error_text}")
+            event = "message"
+            async for raw in response.content:
+                line = raw.decode("utf-8").rstrip("\r\n")
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    data = json.loads(line[len("data:"):].strip())
+                    if event == "error":
+                        raise Exception(f"Relay stream failed: {data.get('detail')}")
+                    yield event, data
+                    if event == "done":
+                        return
+                    event = "message"
+        raise Exception("Relay stream ended without a response")
+
+    async def wait_for_relay_job(
+        self, job_id: str, poll_wait: float = 8, max_wait: float = 120
+    ) -> dict[str, Any]:
+        """
+        Long-poll a queued relay job until it finishes.
+
+        Args:
+            job_id: Job id returned by the backend
+            poll_wait: Seconds each poll may block (below the request timeout)
+            max_wait: Give up after this many seconds in total
+
+        Returns:
+            The relay response dictionary containing 'reply' field
+
+        Raises:
+            Exception: If the job failed, expired or did not finish in time
+        """
+        url = f"{self.base_url}/relay/jobs/{job_id}"
+        session = await self._get_session()
+        deadline = asyncio.get_running_loop().time() + max_wait
+        while asyncio.get_running_loop().time() < deadline:
+            try:
+                async with session.get(url, params={"wait": poll_wait}) as response:
+                    if response.status != 200:
+                        error_text = await response.text()
+                        raise Exception(
+                            f"Backend returned status {response.status}: {error_text}"
+                        )
+                    job = await response.json()
+            except asyncio.TimeoutError:
+                logger.warning(f"Relay job {job_id} poll timed out, polling again")
+                continue
+            if job["status"] == "done":
+                return job["response"]
+            if job["status"] == "failed":
+                raise Exception(f"Relay job {job_id} failed: {job.get('error')}")
+        raise Exception(f"Relay job {job_id} did not finish within {max_wait}s")
+
 
 # Global client instance
 _client: BackendClient | None = None
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""Root-level entry point for re-embedding knowledge with the configured EMBEDDING_MODEL."""
+
+import argparse
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+# Ensure project root is in Python path BEFORE any imports
+project_root = Path(__file__).parent.absolute()
+project_root_str = str(project_root)
+
+if project_root_str not in sys.path:
+    sys.path.insert(0, project_root_str)
+
+os.chdir(project_root_str)
+
+
+async def main(args: argparse.Namespace) -> None:
+    from redis.asyncio import Redis
+
+    from backend.config import config
+    from backend.db.session import async_session_factory, engine
+    from backend.services.embedding_service import get_embedding_batcher
+    from backend.services.reembed_service import reembed_knowledge
+
+    redis = Redis.from_url(config.redis_url, decode_responses=True)
+    try:
+        total = await reembed_knowledge(
+            async_session_factory,
+            redis,
+            batch_size=args.batch_size,
+            concurrency=args.concurrency,
+            restart=args.restart,
+        )
+        print(f"Re-embedded {total} passages with {config.embedding_model}")
+    finally:
+        await get_embedding_batcher().close()
+        await redis.aclose()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Re-embed knowledge passages stored with another model (resumable)."
+    )
+    parser.add_argument("--batch-size", type=int, default=256, help="passages per page")
+    parser.add_argument("--concurrency", type=int, default=4, help="pages in flight")
+    parser.add_argument("--restart", action="store_true", help="ignore the saved checkpoint")
+    asyncio.run(main(parser.parse_args()))
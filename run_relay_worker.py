@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Root-level entry point for relay workers (RELAY_MODE=async)."""
+
+import asyncio
+import os
+import signal
+import sys
+from pathlib import Path
+
+# Ensure project root is in Python path BEFORE any imports
+project_root = Path(__file__).parent.absolute()
+project_root_str = str(project_root)
+
+if project_root_str not in sys.path:
+    sys.path.insert(0, project_root_str)
+
+os.chdir(project_root_str)
+
+
+async def main() -> None:
+    import structlog
+    from redis.asyncio import Redis
+
+    from backend.config import config
+    from backend.db.session import async_session_factory, engine
+    from backend.services.embedding_service import get_embedding_batcher
+    from backend.services.guild_cache import get_guild_cache
+    from backend.services.relay_jobs import RelayWorkerPool
+
+    log = structlog.get_logger()
+    redis = Redis.from_url(config.redis_url, decode_responses=True)
+    await redis.ping()
+    await get_guild_cache().start(redis)
+    pool = RelayWorkerPool(
+        redis,
+        async_session_factory,
+        concurrency=config.relay_worker_concurrency,
+        claim_idle=config.relay_job_claim_s,
+    )
+    await pool.start()
+    log.info("relay_workers_started", concurrency=pool.concurrency)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        await pool.close()
+        await get_guild_cache().close()
+        await get_embedding_batcher().close()
+        await redis.aclose()
+        await engine.dispose()
+        log.info("relay_workers_stopped", completed=pool.completed, failed=pool.failed)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+"""BM25 tokenizing and ranking, and reciprocal rank fusion."""
+
+import pytest
+
+from backend.utils.bm25 import BM25Index, is_identifier, reciprocal_rank_fusion, tokenize
+
+
+def test_tokenize_keeps_identifiers_whole():
+    assert tokenize("Error E-1042 after v2.3.1: run reset_password") == [
+        "error",
+        "e-1042",
+        "after",
+        "v2.3.1",
+        "run",
+        "reset_password",
+    ]
+
+
+def test_is_identifier():
+    assert is_identifier("e-1042") and is_identifier("v2") and is_identifier("reset_password")
+    assert not is_identifier("password")
+
+
+def test_search_ranks_by_term_frequency_and_rarity():
+    index = BM25Index(
+        ["both", "once", "common", "other"],
+        [
+            "refund refund policy",
+            "refund window",
+            "policy update",
+            "policy on shipping",
+        ],
+    )
+    results = index.search("refund policy", k=10)
+    assert [doc_id for doc_id, _ in results] == ["both", "once", "common", "other"]
+    scores = [score for _, score in results]
+    assert scores == sorted(scores, reverse=True) and all(s > 0 for s in scores)
+
+
+def test_search_shorter_document_wins_a_tie_on_term_frequency():
+    index = BM25Index(["short", "long"], ["reset token", "reset token and many other words"])
+    assert index.search("reset", k=2)[0][0] == "short"
+
+
+def test_search_excludes_non_matching_and_respects_k():
+    index = BM25Index([1, 2, 3], ["alpha beta", "alpha", "gamma"])
+    assert [doc_id for doc_id, _ in index.search("alpha", k=1)] == [2]
+    assert index.search("delta", k=5) == []
+    assert len(index) == 3
+
+
+def test_search_on_empty_index():
+    assert BM25Index([], []).search("anything", k=3) == []
+
+
+def test_matched_identifiers_only_reports_codes_in_that_document():
+    index = BM25Index(["a", "b"], ["Fix for E-1042 in v2.3", "General password help"])
+    assert index.matched_identifiers("password error E-1042", "a") == ["e-1042"]
+    assert index.matched_identifiers("password error E-1042", "b") == []
+
+
+def test_rrf_rewards_ids_ranked_by_both_lists():
+    fused = reciprocal_rank_fusion([["x", "y", "z"], ["y", "w"]])
+    assert fused[0] == "y"
+    assert set(fused) == {"x", "y", "z", "w"}
+    # x and w are both first in one list only; z is third in one list only
+    assert fused.index("z") == 3
+
+
+def test_rrf_scores_follow_the_k_constant():
+    fused = reciprocal_rank_fusion([["a", "b"], ["b", "a"], ["a"]], k=1)
+    # a: 1/2 + 1/3 + 1/2, b: 1/3 + 1/2
+    assert fused == ["a", "b"]
+    assert reciprocal_rank_fusion([]) == []
+
+
+@pytest.mark.parametrize("k", [0, 60])
+def test_rrf_single_ranking_keeps_order(k):
+    assert reciprocal_rank_fusion([[3, 1, 2]], k=k) == [3, 1, 2]
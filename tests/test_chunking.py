@@ -0,0 +1,51 @@
+"""split_passages: passage sizes and overlap boundaries."""
+
+from backend.utils.chunking import split_passages
+
+
+def _words(n: int) -> str:
+    return " ".join(f"w{i}" for i in range(n))
+
+
+def test_empty_and_whitespace_text_has_no_passages():
+    assert split_passages("") == []
+    assert split_passages(" \n\t ") == []
+
+
+def test_short_text_is_one_passage_with_whitespace_collapsed():
+    assert split_passages("reset  your\npassword\tfirst", max_words=10) == [
+        "reset your password first"
+    ]
+
+
+def test_text_of_exactly_max_words_is_not_split():
+    assert split_passages(_words(10), max_words=10, overlap=3) == [_words(10)]
+
+
+def test_consecutive_passages_share_overlap_words():
+    passages = split_passages(_words(25), max_words=10, overlap=3)
+    words = [p.split() for p in passages]
+    # Starts step by max_words - overlap; the last passage ends on the last word
+    assert [w[0] for w in words] == ["w0", "w7", "w14", "w21"]
+    assert words[-1][-1] == "w24"
+    assert all(len(w) <= 10 for w in words)
+    for prev, nxt in zip(words, words[1:]):
+        assert prev[-3:] == nxt[:3]
+
+
+def test_one_word_over_max_adds_a_passage_of_overlap_plus_one():
+    passages = split_passages(_words(11), max_words=10, overlap=3)
+    assert len(passages) == 2
+    assert passages[1].split() == ["w7", "w8", "w9", "w10"]
+
+
+def test_no_overlap_gives_disjoint_passages():
+    words = _words(20).split()
+    passages = split_passages(_words(20), max_words=10, overlap=0)
+    assert passages == [" ".join(words[:10]), " ".join(words[10:])]
+
+
+def test_overlap_not_below_max_words_still_advances():
+    passages = split_passages(_words(5), max_words=3, overlap=5)
+    assert [p.split()[0] for p in passages] == ["w0", "w1", "w2"]
+    assert passages[-1].split()[-1] == "w4"
@@ -0,0 +1,77 @@
+"""Embedding blob encoding: float32 round trip and int8 quantization error."""
+
+import numpy as np
+import pytest
+
+from backend.config import config
+from backend.db.types import CompactEmbedding, decode_embedding, encode_embedding
+
+
+def _vector(dim: int = 384, seed: int = 0) -> np.ndarray:
+    v = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return v / np.linalg.norm(v)
+
+
+def test_float32_round_trip_is_exact():
+    v = _vector()
+    blob = encode_embedding(v)
+    assert len(blob) == 8 + 4 * v.size
+    decoded = decode_embedding(blob)
+    assert decoded.dtype == np.float32
+    np.testing.assert_array_equal(decoded, v)
+
+
+def test_float32_accepts_lists():
+    np.testing.assert_array_equal(
+        decode_embedding(encode_embedding([0.5, -1.0, 2.0])), [0.5, -1.0, 2.0]
+    )
+
+
+def test_int8_error_within_half_a_step():
+    v = _vector()
+    blob = encode_embedding(v, "int8")
+    assert len(blob) == 8 + v.size
+    decoded = decode_embedding(blob)
+    step = float(np.max(np.abs(v))) / 127
+    assert float(np.max(np.abs(decoded - v))) <= step / 2 + 1e-7
+    # The largest component is represented exactly (it maps to +/-127)
+    peak = int(np.argmax(np.abs(v)))
+    assert decoded[peak] == pytest.approx(v[peak], rel=1e-6)
+
+
+def test_int8_keeps_cosine_similarity():
+    v, w = _vector(seed=1), _vector(seed=2)
+    qv = decode_embedding(encode_embedding(v, "int8"))
+    qw = decode_embedding(encode_embedding(w, "int8"))
+    exact = float(v @ w)
+    approx = float(qv @ qw) / float(np.linalg.norm(qv) * np.linalg.norm(qw))
+    assert approx == pytest.approx(exact, abs=0.01)
+
+
+def test_int8_zero_vector():
+    decoded = decode_embedding(encode_embedding(np.zeros(4), "int8"))
+    np.testing.assert_array_equal(decoded, np.zeros(4, dtype=np.float32))
+
+
+def test_unknown_format_tag_raises():
+    blob = b"xx\x00\x00" + encode_embedding([1.0])[4:]
+    with pytest.raises(ValueError):
+        decode_embedding(blob)
+
+
+def test_column_type_binds_with_configured_storage(monkeypatch):
+    column = CompactEmbedding()
+    monkeypatch.setattr(config, "embedding_storage", "int8")
+    blob = column.process_bind_param([0.25, -0.5], None)
+    assert len(blob) == 8 + 2
+    np.testing.assert_allclose(column.process_result_value(blob, None), [0.25, -0.5], atol=0.002)
+    assert column.process_bind_param(None, None) is None
+
+
+def test_compare_values_compares_whole_arrays():
+    column = CompactEmbedding()
+    v = _vector(dim=8)
+    assert column.compare_values(v, v.tolist())
+    assert not column.compare_values(v, v * 2)
+    assert column.compare_values(None, None)
+    assert not column.compare_values(v, None)
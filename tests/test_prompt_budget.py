@@ -0,0 +1,120 @@
+"""Token counting/truncation and prompt fitting to a token budget."""
+
+import sys
+import types
+from collections import OrderedDict
+
+import pytest
+
+from backend.config import config
+from backend.services.prompt_builder import build_prompt_context, min_prompt_tokens
+from backend.utils import tokens
+from backend.utils.tokens import TRUNCATION_MARKER, count_tokens, truncate_tokens
+
+# The uncached loader, before the fixture below replaces it
+_load_encoding = tokens._get_encoding.__wrapped__
+
+
+@pytest.fixture(autouse=True)
+def estimate_tokens(monkeypatch):
+    """Count with the 4-characters-per-token estimate, whatever is installed."""
+    monkeypatch.setattr(tokens, "_get_encoding", lambda: None)
+    monkeypatch.setattr(tokens, "_counts", OrderedDict())
+    monkeypatch.setattr(config, "prompt_system_max_tokens", 600)
+    monkeypatch.setattr(config, "prompt_message_max_tokens", 800)
+    monkeypatch.setattr(config, "prompt_max_messages", 8)
+    monkeypatch.setattr(config, "prompt_knowledge_share", 0.6)
+
+
+def _msg(role: str, content: str) -> dict[str, str]:
+    return {"role": role, "content": content}
+
+
+def test_count_tokens_estimate():
+    assert count_tokens("") == 0
+    assert count_tokens("abcd") == 1
+    assert count_tokens("abcde") == 2
+
+
+def test_truncate_keeps_short_text_and_cuts_long_text():
+    assert truncate_tokens("short", 10) == "short"
+    assert truncate_tokens("anything", 0) == ""
+    cut = truncate_tokens("x" * 400, 20)
+    assert count_tokens(cut) <= 20
+    assert cut.endswith(TRUNCATION_MARKER.rstrip())
+
+
+def test_truncate_keep_tail_cuts_the_middle():
+    text = "A" * 40 + "x" * 400 + "Z" * 40
+    cut = truncate_tokens(text, 30, keep_tail=True)
+    assert count_tokens(cut) <= 30
+    assert cut.startswith("A") and cut.endswith("Z")
+    assert TRUNCATION_MARKER in cut
+
+
+def test_encoding_load_failure_falls_back_to_estimate(monkeypatch):
+    def broken(name):
+        raise OSError("no network to fetch the encoding")
+
+    monkeypatch.setitem(sys.modules, "tiktoken", types.SimpleNamespace(get_encoding=broken))
+    assert _load_encoding() is None
+
+
+def test_system_prompt_and_current_message_always_kept():
+    history = [_msg("user", "earlier question"), _msg("user", "A" * 40 + "x" * 4000 + "Z" * 40)]
+    context = build_prompt_context(
+        "be helpful", [{"title": "t", "content": "c" * 400}], history, budget=0
+    )
+    assert context.system_prompt == "be helpful"
+    assert context.knowledge_chunks == []
+    # Only the current message, capped with its start and end intact
+    (current,) = context.message_history
+    assert current["content"].startswith("A") and current["content"].endswith("Z")
+    assert count_tokens(current["content"]) <= config.prompt_message_max_tokens
+    assert context.token_count == min_prompt_tokens("be helpful", history[-1]["content"])
+
+
+def test_knowledge_best_first_with_last_passage_truncated():
+    system = "s" * 40  # 10 tokens
+    history = [_msg("user", "m" * 40)]  # 10 + 4 overhead
+    chunks = [
+        {"title": "best", "content": "a" * 200},  # 1 + 50 + 4
+        {"title": "next", "content": "b" * 400},  # too big, cut to fit
+        {"title": "last", "content": "c" * 40},
+    ]
+    context = build_prompt_context(system, chunks, history, budget=150)
+    titles = [chunk["title"] for chunk in context.knowledge_chunks]
+    assert titles == ["best", "next"]
+    assert context.knowledge_chunks[0]["content"] == "a" * 200
+    assert context.knowledge_chunks[1]["content"].endswith(TRUNCATION_MARKER.rstrip())
+    assert context.token_count <= 150
+
+
+def test_too_small_remainder_drops_passage_instead_of_stub():
+    chunks = [{"title": "t", "content": "a" * 200}, {"title": "u", "content": "b" * 400}]
+    # 24 fixed + 55 for the first passage leaves under MIN_KNOWLEDGE_TOKENS
+    context = build_prompt_context("s" * 40, chunks, [_msg("user", "m" * 40)], budget=110)
+    assert [chunk["title"] for chunk in context.knowledge_chunks] == ["t"]
+
+
+def test_history_keeps_newest_whole_messages():
+    earlier = [_msg("user", c * 80) for c in "pqr"]  # 20 + 4 tokens each
+    current = _msg("user", "m" * 40)
+    # 24 fixed tokens, room for exactly two earlier messages
+    context = build_prompt_context("s" * 40, [], [*earlier, current], budget=24 + 48)
+    assert context.message_history == [*earlier[1:], current]
+    assert context.token_count == 24 + 48
+
+
+def test_unused_history_budget_goes_to_knowledge():
+    chunks = [{"title": "t", "content": "a" * 480}]  # 1 + 120 + 4 tokens
+    # The knowledge share alone (0.6 * 176 = 105) couldn't fit the passage
+    context = build_prompt_context("s" * 40, chunks, [_msg("user", "m" * 40)], budget=200)
+    assert context.knowledge_chunks == chunks
+
+
+def test_history_limited_to_prompt_max_messages(monkeypatch):
+    monkeypatch.setattr(config, "prompt_max_messages", 3)
+    history = [_msg("user", f"message {i}") for i in range(6)]
+    context = build_prompt_context("", [], history, budget=1000)
+    assert context.message_history == history[-3:]
@@ -0,0 +1,95 @@
+"""RelayScheduler: weighted-fair slot handover and queue timeout."""
+
+import asyncio
+
+import pytest
+
+from backend.services.relay_scheduler import (
+    RelayScheduler,
+    RelaySchedulerBusyError,
+    parse_plan_weights,
+)
+
+
+async def _admission_order(
+    scheduler: RelayScheduler, waiters: list[tuple[str, int]]
+) -> list[tuple[str, int]]:
+    """Queue ``waiters`` behind a held slot, free it and record who runs when."""
+    order: list[tuple[str, int]] = []
+    release = asyncio.Event()
+
+    async def holder() -> None:
+        async with scheduler.slot("free", 0):
+            await release.wait()
+
+    async def waiter(plan: str, guild_id: int) -> None:
+        async with scheduler.slot(plan, guild_id):
+            order.append((plan, guild_id))
+
+    held = asyncio.create_task(holder())
+    await asyncio.sleep(0)
+    tasks = [asyncio.create_task(waiter(plan, guild)) for plan, guild in waiters]
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(held, *tasks)
+    return order
+
+
+def test_parse_plan_weights_fills_missing_plans():
+    weights = parse_plan_weights("pro:4, business:8")
+    assert weights["pro"] == 4 and weights["business"] == 8
+    assert weights["free"] == 1
+
+
+def test_stride_serves_plans_in_proportion_to_weight():
+    scheduler = RelayScheduler(capacity=1, weights={"free": 1.0, "pro": 4.0}, timeout=5)
+    waiters = [("free", 1)] * 10 + [("pro", 2)] * 10
+    order = asyncio.run(_admission_order(scheduler, waiters))
+    first = [plan for plan, _ in order[:10]]
+    # Four pro relays per free one while both plans wait; free isn't starved
+    assert first.count("pro") == 8 and first.count("free") == 2
+    assert len(order) == 20
+    assert scheduler.stats()["inflight"] == 0
+
+
+def test_guilds_take_turns_within_a_plan():
+    scheduler = RelayScheduler(capacity=1, weights={"free": 1.0}, timeout=5)
+    waiters = [("free", 1), ("free", 1), ("free", 1), ("free", 2)]
+    order = asyncio.run(_admission_order(scheduler, waiters))
+    # Guild 2's single relay doesn't wait behind guild 1's whole burst
+    assert order.index(("free", 2)) == 1
+
+
+def test_unknown_plan_is_queued_as_free():
+    scheduler = RelayScheduler(capacity=1, weights={"free": 1.0}, timeout=5)
+    order = asyncio.run(_admission_order(scheduler, [("enterprise", 1)]))
+    assert order == [("enterprise", 1)]
+    assert scheduler.stats()["plans"]["free"]["admitted"] == 2
+
+
+def test_waiter_times_out_as_busy_and_leaves_queue():
+    scheduler = RelayScheduler(capacity=1, weights={"free": 1.0}, timeout=0.05)
+
+    async def main() -> None:
+        release = asyncio.Event()
+
+        async def holder() -> None:
+            async with scheduler.slot("free", 1):
+                await release.wait()
+
+        held = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+        with pytest.raises(RelaySchedulerBusyError):
+            async with scheduler.slot("free", 2):
+                pass
+        stats = scheduler.stats()
+        assert stats["plans"]["free"]["timeouts"] == 1
+        assert stats["plans"]["free"]["queued"] == 0
+        release.set()
+        await held
+        # The freed slot goes back to the pool, not to the departed waiter
+        assert scheduler.stats()["inflight"] == 0
+        async with scheduler.slot("free", 3):
+            assert scheduler.stats()["inflight"] == 1
+
+    asyncio.run(main())
@@ -0,0 +1,165 @@
+"""Streaming relay: fake model, relay_message_stream and SSE framing."""
+
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from backend.api import relay as relay_api
+from backend.config import config
+from backend.schemas.relay import PromptContext, RelayRequest, RelayResponse
+from backend.services import relay_service
+from backend.services.reply_generator import PLACEHOLDER_REPLY, generate_reply
+from backend.utils.timing import track_stages
+
+PAYLOAD = RelayRequest(guild_id="1", channel_id="2", user_id="3", content="hi", message_id="m1")
+
+
+class FakeRedis:
+    """Just enough of redis.asyncio.Redis for idempotency claims."""
+
+    def __init__(self) -> None:
+        self.data: dict[str, str] = {}
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    def register_script(self, script):
+        async def release(keys, args, client):
+            if self.data.get(keys[0]) == args[0]:
+                del self.data[keys[0]]
+                return 1
+            return 0
+
+        return release
+
+
+class FakeSession:
+    def __init__(self) -> None:
+        self.commits = 0
+
+    async def commit(self) -> None:
+        self.commits += 1
+
+
+async def _collect(stream) -> list:
+    return [item async for item in stream]
+
+
+def _fake_relay(pieces: list[str], status: str = "ok"):
+    async def relay(payload, session, redis):
+        for piece in pieces:
+            yield piece
+        yield RelayResponse(status=status, reply="".join(pieces))
+
+    return relay
+
+
+def test_generate_reply_streams_placeholder_words(monkeypatch):
+    monkeypatch.setattr(config, "fake_model_token_delay_ms", 0)
+    pieces = asyncio.run(_collect(generate_reply(PromptContext())))
+    assert len(pieces) == len(PLACEHOLDER_REPLY.split(" "))
+    assert "".join(pieces) == PLACEHOLDER_REPLY
+
+
+def test_relay_message_stream_yields_pieces_then_response(monkeypatch):
+    monkeypatch.setattr(relay_service, "_relay", _fake_relay(["Hel", "lo"]))
+    redis, session = FakeRedis(), FakeSession()
+    items = asyncio.run(_collect(relay_service.relay_message_stream(PAYLOAD, session, redis)))
+    assert items[:2] == ["Hel", "lo"]
+    assert isinstance(items[-1], RelayResponse) and items[-1].reply == "Hello"
+    assert session.commits == 1
+    # The result is stored for retries of the same Discord message
+    stored = redis.data[relay_service.relay_idempotency_key(1, "m1")]
+    assert RelayResponse.model_validate_json(stored).reply == "Hello"
+
+
+def test_relay_message_stream_replays_duplicate_without_pieces(monkeypatch):
+    monkeypatch.setattr(relay_service, "_relay", _fake_relay(["Hel", "lo"]))
+    redis = FakeRedis()
+    asyncio.run(_collect(relay_service.relay_message_stream(PAYLOAD, FakeSession(), redis)))
+    items = asyncio.run(_collect(relay_service.relay_message_stream(PAYLOAD, FakeSession(), redis)))
+    assert len(items) == 1 and items[0].reply == "Hello"
+
+
+def test_relay_message_stream_releases_claim_when_busy(monkeypatch):
+    monkeypatch.setattr(relay_service, "_relay", _fake_relay([], status="busy"))
+    redis = FakeRedis()
+    asyncio.run(_collect(relay_service.relay_message_stream(PAYLOAD, FakeSession(), redis)))
+    assert relay_service.relay_idempotency_key(1, "m1") not in redis.data
+
+
+def test_relay_message_returns_final_response(monkeypatch):
+    monkeypatch.setattr(relay_service, "_relay", _fake_relay(["a", "b"]))
+    response = asyncio.run(relay_service.relay_message(PAYLOAD, FakeSession(), FakeRedis()))
+    assert response.status == "ok" and response.reply == "ab"
+
+
+class _SessionFactory:
+    async def __aenter__(self):
+        return FakeSession()
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+def _parse_sse(chunks: list[str]) -> list[tuple[str, dict]]:
+    events = []
+    for chunk in chunks:
+        assert chunk.endswith("\n\n")
+        event, data = chunk.strip("\n").split("\n")
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+def test_sse_frames_tokens_then_done(monkeypatch):
+    async def stream(payload, session, redis):
+        yield "Hi"
+        yield " there"
+        yield RelayResponse(status="ok", reply="Hi there")
+
+    monkeypatch.setattr(relay_api, "relay_message_stream", stream)
+    monkeypatch.setattr(relay_api, "async_session_factory", _SessionFactory)
+    events = _parse_sse(asyncio.run(_collect(relay_api._relay_events(PAYLOAD, FakeRedis()))))
+    assert events[:2] == [("token", {"text": "Hi"}), ("token", {"text": " there"})]
+    assert events[2][0] == "done" and events[2][1]["reply"] == "Hi there"
+
+
+def test_sse_reports_errors_as_event(monkeypatch):
+    async def stream(payload, session, redis):
+        yield "Hi"
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(relay_api, "relay_message_stream", stream)
+    monkeypatch.setattr(relay_api, "async_session_factory", _SessionFactory)
+    events = _parse_sse(asyncio.run(_collect(relay_api._relay_events(PAYLOAD, FakeRedis()))))
+    assert events == [("token", {"text": "Hi"}), ("error", {"detail": "Internal server error"})]
+
+
+def test_track_stages_survives_generator_closed_in_another_context():
+    async def gen():
+        with track_stages():
+            yield 1
+            yield 2
+
+    async def main():
+        stream = gen()
+        assert await anext(stream) == 1
+        # An abandoned SSE stream is finalized from a different task/context
+        await asyncio.create_task(stream.aclose())
+
+    asyncio.run(main())
+
+
+def test_stream_endpoint_rejected_in_async_mode(monkeypatch):
+    monkeypatch.setattr(config, "relay_mode", "async")
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(relay_api.relay_message_sse(PAYLOAD, FakeRedis()))
+    assert exc.value.status_code == 409